@@ -5,10 +5,19 @@
 """
 
 import os
+import json
+import hashlib
+import io
+import queue
+import multiprocessing
+from collections import OrderedDict
+from itertools import islice
 from pathlib import Path
 import threading
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait, FIRST_COMPLETED
 import tkinter as tk
-from tkinter import ttk, filedialog, messagebox
+from tkinter import ttk, filedialog, messagebox, simpledialog, colorchooser
 
 try:
     # 拖拽依赖
@@ -17,17 +26,275 @@ try:
 except Exception:
     DND_AVAILABLE = False
 
-from PIL import Image, ImageTk
-
-from photo_watermark import PhotoWatermark
+# Pillow / photo_watermark 按需导入，缩短启动到首帧的时间
 
 
 SUPPORTED_EXTS = {'.jpg', '.jpeg', '.png', '.tiff', '.tif', '.bmp'}
+# 供 str.endswith 一次性匹配的扩展名元组（与小写文件名比较）
+_EXT_SUFFIXES = tuple(SUPPORTED_EXTS)
+# 全小写/全大写两种写法，目录遍历时先直接匹配原文件名，免去 lower() 分配
+_EXT_CASED = _EXT_SUFFIXES + tuple(e.upper() for e in SUPPORTED_EXTS)
+# 界面提示用的格式列表
+SUPPORTED_EXTS_LABEL = ', '.join(sorted(e.upper().lstrip('.') for e in SUPPORTED_EXTS))
+THUMB_SIZE = 120
+ROW_HEIGHT = THUMB_SIZE + 12  # 列表每行高度（含上下间距）
+THUMB_DRAIN_MS = 50  # 主线程取回缩略图的周期
+THUMB_DRAIN_BATCH = 32  # 每个周期最多安装的缩略图数
+# PNG/TIFF/BMP 解码不完全释放 GIL，交给进程池；JPEG 留在线程池
+PROC_THUMB_EXTS = {'.png', '.tif', '.tiff', '.bmp'}
+THUMB_PHOTO_LIMIT = 256  # 最多同时保留的缩略图 PhotoImage 数
+EXPORT_POLL_MS = 100  # 主线程刷新导出进度的周期
+DROP_SCANDIR_MIN = 100  # 同一父目录拖入条目达到该数量时改用 scandir 批量判断
+INGEST_BATCH = 100  # 后台扫描每批交给主线程的文件数
+INGEST_DRAIN_MS = 50  # 主线程取回扫描结果的周期
+PREVIEW_DEBOUNCE_MS = 50  # 预览重绘的合并窗口：窗口缩放/拖动期间只渲染最后一次
+PREVIEW_POLL_MS = 15  # 有预览任务时主线程取回结果的周期
+# 不影响预览画面的选项
+_PREVIEW_IGNORED_OPTS = frozenset({'output_dir', 'allow_same_dir', 'output_format', 'jpeg_quality',
+                                   'png_compress_level', 'name_prefix', 'name_suffix'})
+PREVIEW_REDUCING_GAP = 2.0  # 预览缩放时先整数倍缩小到目标尺寸的 2 倍以内
+INGEST_BATCHES_PER_TICK = 10  # 每个周期最多加入的批数
+# 可选 pyvips 后端支持的格式（BMP 等交给 Pillow）
+VIPS_THUMB_EXTS = {'.jpg', '.jpeg', '.png', '.tif', '.tiff'}
+_VIPS_MODES = {1: 'L', 2: 'LA', 3: 'RGB', 4: 'RGBA'}
+_pyvips = None  # None: 尚未尝试导入；False: 不可用
+# 缩略图磁盘缓存目录（按 路径+修改时间+尺寸 命名）
+THUMB_CACHE_DIR = Path.home() / '.cache' / 'photoWatermark' / 'thumbs'
+THUMB_CACHE_LIMIT = 200 * 1024 * 1024  # 磁盘缓存上限，超出后按最近使用时间淘汰
+
+
+class LRUCache(OrderedDict):
+    """容量有限的 LRU 字典，超出容量时淘汰最久未使用的项并回调 on_evict(key)"""
+
+    def __init__(self, maxlen, on_evict=None):
+        super().__init__()
+        self.maxlen = maxlen
+        self.on_evict = on_evict
+
+    def __getitem__(self, key):
+        value = super().__getitem__(key)
+        self.move_to_end(key)
+        return value
+
+    def get(self, key, default=None):
+        if key in self:
+            return self[key]
+        return default
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self.move_to_end(key)
+        while len(self) > self.maxlen:
+            old_key, _ = self.popitem(last=False)
+            if self.on_evict:
+                self.on_evict(old_key)
+
+
+def _thumb_cache_path(path: str, st=None):
+    st = st or os.stat(path)
+    key = f"{path}|{st.st_mtime_ns}|{st.st_size}|{THUMB_SIZE}"
+    return THUMB_CACHE_DIR / (hashlib.blake2b(key.encode('utf-8'), digest_size=16).hexdigest() + '.png')
+
+
+def _prune_thumb_cache(limit=THUMB_CACHE_LIMIT):
+    """缓存目录超过 limit 字节时，按修改时间从旧到新删除（命中时会刷新修改时间）"""
+    try:
+        entries = []
+        total = 0
+        with os.scandir(THUMB_CACHE_DIR) as it:
+            for entry in it:
+                if entry.is_file(follow_symlinks=False):
+                    st = entry.stat()
+                    entries.append((st.st_mtime, st.st_size, entry.path))
+                    total += st.st_size
+        if total <= limit:
+            return
+        entries.sort()
+        for _, size, path in entries:
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            if total <= limit:
+                break
+    except OSError:
+        pass
+
+
+def _has_pillow_simd():
+    """是否安装了 Pillow-SIMD（读取安装元数据判断，不导入 PIL，避免拖慢启动）"""
+    from importlib import metadata
+    try:
+        metadata.version('Pillow-SIMD')
+        return True
+    except Exception:  # 含 PackageNotFoundError
+        return False
+
+
+def _load_pyvips():
+    global _pyvips
+    if _pyvips is None:
+        try:
+            import pyvips
+            _pyvips = pyvips
+        except Exception:
+            # 未安装 pyvips 或缺少 libvips 动态库
+            _pyvips = False
+    return _pyvips or None
+
+
+def _vips_thumbnail(path: str):
+    """可选 pyvips 后端：shrink-on-load 生成缩略图，返回 PIL.Image；不可用或失败返回 None"""
+    if os.path.splitext(path)[1].lower() not in VIPS_THUMB_EXTS:
+        return None
+    pyvips = _load_pyvips()
+    if pyvips is None:
+        return None
+    from PIL import Image
+    try:
+        vim = pyvips.Image.thumbnail(path, THUMB_SIZE, height=THUMB_SIZE, size='down')
+        if vim.format != 'uchar':
+            # 16 位等高位深图像转为 8 位
+            vim = vim.colourspace('srgb' if vim.bands >= 3 else 'b-w').cast('uchar')
+        mode = _VIPS_MODES.get(vim.bands)
+        if mode is None:
+            return None
+        return Image.frombytes(mode, (vim.width, vim.height), vim.write_to_memory())
+    except Exception:
+        return None
+
+
+def _thumb_worker(path: str):
+    """后台线程/进程：生成缩略图，返回 (png_bytes, exif_mtime_ns, exif_dt)（失败返回 None）
+
+    返回压缩后的 PNG 字节而非 PIL.Image：跨进程传递开销小，主线程也只需常驻几 KB/张。
+    解码原图时顺带读取拍摄时间（exif_mtime_ns 为读取时文件的修改时间，未读取为 None），
+    供导出时跳过重复的 EXIF 解析；文件之后被修改则不再命中。
+    """
+    from PIL import Image
+    from photo_watermark import exif_datetime_from_image
+    exif_mtime_ns, exif_dt = None, None
+    try:
+        st = os.stat(path)
+        cached = _thumb_cache_path(path, st)
+    except Exception:
+        st = cached = None
+    # 命中磁盘缓存则直接返回文件内容，无需解码
+    if cached is not None and cached.exists():
+        try:
+            blob = cached.read_bytes()
+            # 刷新修改时间，作为 LRU 淘汰依据
+            os.utime(cached)
+            return blob, exif_mtime_ns, exif_dt
+        except Exception:
+            pass
+    try:
+        with Image.open(path) as im:
+            # 只读元数据，不触发像素解码
+            exif_dt = exif_datetime_from_image(im)
+            if st is not None:
+                exif_mtime_ns = st.st_mtime_ns
+            # 优先使用 pyvips（若已安装），否则走 Pillow
+            thumb = _vips_thumbnail(path)
+            if thumb is None:
+                if im.format == 'JPEG':
+                    # 让 libjpeg 按 1/2、1/4、1/8 缩放解码，保留 2 倍于目标尺寸的余量
+                    im.draft('RGB', (THUMB_SIZE * 2, THUMB_SIZE * 2))
+                im.thumbnail((THUMB_SIZE, THUMB_SIZE), Image.Resampling.BILINEAR)
+                thumb = im.copy()
+        if thumb.mode not in ('RGB', 'RGBA'):
+            has_alpha = thumb.mode in ('LA', 'PA') or 'transparency' in thumb.info
+            thumb = thumb.convert('RGBA' if has_alpha else 'RGB')
+        buf = io.BytesIO()
+        thumb.save(buf, 'PNG', optimize=False)
+        blob = buf.getvalue()
+    except Exception:
+        return None
+    if cached is not None:
+        # 先写临时文件再 os.replace：中途被杀也不会在有效键下留下半个文件
+        tmp = cached.with_name(f"{cached.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            cached.parent.mkdir(parents=True, exist_ok=True)
+            tmp.write_bytes(blob)
+            os.replace(tmp, cached)
+        except Exception:
+            try:
+                tmp.unlink()
+            except OSError:
+                pass
+    return blob, exif_mtime_ns, exif_dt
+
+
+def _watermark_kwargs(opts):
+    """把 GUI 选项字典转换为 PhotoWatermark.add_watermark 的水印/输出参数"""
+    return dict(
+        font_size=opts['font_size'],
+        color=opts['color'],
+        position=opts['position'],
+        output_format=opts['output_format'],
+        jpeg_quality=opts['jpeg_quality'],
+        png_compress_level=opts.get('png_compress_level', 6),
+        resize_width=opts['resize_width'],
+        resize_height=opts['resize_height'],
+        resize_percent=opts['resize_percent'],
+        text_content=opts['text_content'],
+        text_font_size=opts['text_font_size'],
+        text_color=opts['text_color'],
+        text_opacity=opts['text_opacity'],
+        font_path=opts['font_path'],
+        text_stroke_width=opts['text_stroke_width'],
+        text_stroke_color=opts['text_stroke_color'],
+        text_shadow=opts['text_shadow'],
+        text_shadow_offset=opts['text_shadow_offset'],
+        text_shadow_color=opts['text_shadow_color'],
+        text_shadow_opacity=opts['text_shadow_opacity'],
+        logo_path=opts['logo_path'],
+        logo_scale_percent=opts['logo_scale_percent'],
+        logo_width=opts['logo_width'],
+        logo_height=opts['logo_height'],
+        logo_opacity=opts['logo_opacity'],
+        rotation_angle=opts['rotation_angle'],
+        use_manual_position=opts['use_manual_position'],
+        manual_pos_rel=opts['manual_pos_rel'],
+    )
+
+
+def _write_json_atomic(path: Path, data):
+    """写入 JSON：内容未变则跳过；否则先写临时文件再 os.replace，避免中途崩溃留下半个文件"""
+    text = json.dumps(data, ensure_ascii=False, indent=2)
+    try:
+        if path.read_text(encoding='utf-8') == text:
+            return
+    except OSError:
+        pass
+    tmp = path.with_name(path.name + '.tmp')
+    tmp.write_text(text, encoding='utf-8')
+    os.replace(tmp, path)
+
+
+@lru_cache(maxsize=128)
+def _parse_int(text):
+    """将输入框文本解析为非负整数，空或非法返回 None"""
+    text = text.strip()
+    return int(text) if text.isdigit() else None
+
+
+@lru_cache(maxsize=128)
+def _parse_float(text):
+    """将输入框文本解析为浮点数，空或非法返回 None"""
+    text = text.strip()
+    if not text:
+        return None
+    try:
+        return float(text)
+    except ValueError:
+        return None
 
 
 class WatermarkGUI:
     def __init__(self):
-        self.watermark = PhotoWatermark()
+        self.watermark = None  # 首次预览/导出时创建
         self.root = (TkinterDnD.Tk() if DND_AVAILABLE else tk.Tk())
         self.root.title("图片水印工具 - GUI")
         self.root.geometry("980x640")
@@ -36,10 +303,38 @@ class WatermarkGUI:
         self._last_settings_path = Path(__file__).with_name("last_settings.json")
 
         self.files = []  # 存储文件的绝对路径
-        self.thumbnails = {}  # 防止被GC: path -> PhotoImage
+        self._files_set = set()  # 与 files 同步的去重键（os.path.normcase 后的路径），O(1) 查重
+        # 防止被GC: path -> PhotoImage（仅为可见行创建，按 LRU 限制数量）
+        self.thumbnails = LRUCache(THUMB_PHOTO_LIMIT, on_evict=self._on_thumb_evicted)
+        self._thumb_blobs = {}  # path -> 缩略图 PNG 字节（失败为 None），按需解码为 PhotoImage
+        self._thumb_futures = {}  # path -> 已提交、尚未取回的解码任务
+        self._exif_cache = {}  # path -> (st_mtime_ns, 拍摄时间 datetime 或 None)，生成缩略图时读到
+        self._row_pool = []  # 复用的列表行控件
+        self._scrollregion = None
+        self._in_refresh = False
+        self._viewport_pending = False
+        self._q_pending = None  # 待刷新的 JPEG 质量值（空闲时写入标签）
+        self._preview_after = None  # 已排队的预览重绘 after 标识
+        # 目录扫描在单独线程中进行，结果分批经队列交回主线程
+        self._scan_pool = ThreadPoolExecutor(max_workers=1)
+        self._paths_q = queue.Queue()  # 扫描线程 -> 主线程：list[str]
+        self._export_q = queue.Queue()  # 导出线程 -> 主线程：(kind, a, b)
+        self._export_pool = None  # 导出进行中的进程池，关闭窗口时取消未开始的任务
+        self._closing = threading.Event()
+        # 缩略图解码线程池：解码/缩放在后台完成，PhotoImage 仍在主线程创建
+        self._thumb_pool = ThreadPoolExecutor(max_workers=os.cpu_count())
+        # 子进程统一用 spawn 启动：Linux 默认 fork 会复制已运行 Tk 与多个线程的主进程，可能死锁
+        self._proc_pool = ProcessPoolExecutor(max_workers=min(4, os.cpu_count() or 1),
+                                              mp_context=multiprocessing.get_context('spawn'))
+        self._thumb_q = queue.Queue()  # 工作线程 -> 主线程：(path, (png_bytes, exif_mtime_ns, exif_dt) 或 None)
 
         self._build_layout()
         self._bind_dnd_if_available()
+        # 定时批量取回已完成的缩略图与扫描到的文件
+        self.root.after(THUMB_DRAIN_MS, self._drain_thumb_queue)
+        self.root.after(INGEST_DRAIN_MS, self._drain_paths_queue)
+        # 后台清理超出上限的缩略图缓存
+        self._thumb_pool.submit(_prune_thumb_cache)
         # 尝试加载上次设置或默认模板
         try:
             self._load_last_settings_or_default()
@@ -77,27 +372,37 @@ class WatermarkGUI:
         self.preview_canvas.bind("<ButtonRelease-1>", self._on_preview_mouse_up)
         self._dragging = False
         self._last_preview_tk = None  # PhotoImage for canvas
+        self._preview_item = None  # 预览画布上常驻的图像项
         self.selected_file = None
+        # 预览缓存：原图按 (路径, mtime_ns) 只解码一次；适配画布后的小图按尺寸参数复用
+        self._preview_src_key = None
+        self._preview_src = None
+        self._preview_fit_key = None
+        self._preview_fit = None  # (缩放后的图, (x, y, nw, nh))
+        # 预览合成在单独线程中进行；_preview_gen 递增，旧请求的结果直接丢弃
+        self._preview_pool = ThreadPoolExecutor(max_workers=1)
+        self._preview_q = queue.Queue()  # 预览线程 -> 主线程：(gen, future)
+        self._preview_gen = 0
+        self._preview_inflight = 0
+        self._preview_last_key = None  # 最近一次提交的 (文件, 画布尺寸, 预览相关选项)
         self.manual_pos_rel = (0.0, 0.0)  # 相对坐标(0-1)，始终可拖动
         self._has_manual = False  # 是否使用手动定位（拖动后生效，选择预设则清空）
         self._preview_box = None  # (x0, y0, w, h) 图像在画布中的区域
 
         hint = ttk.Label(work_panel, text=(
             "将图片或文件夹拖拽到下方列表，或使用按钮添加\n"
-            f"支持格式：{', '.join(sorted(e.upper().lstrip('.') for e in SUPPORTED_EXTS))}"
+            f"支持格式：{SUPPORTED_EXTS_LABEL}"
         ))
         hint.pack(pady=4)
 
         # 可滚动缩略图容器
         self.canvas = tk.Canvas(work_panel, borderwidth=0, highlightthickness=1, highlightbackground="#ddd")
         self.scroll = ttk.Scrollbar(work_panel, orient=tk.VERTICAL, command=self.canvas.yview)
-        self.canvas.configure(yscrollcommand=self.scroll.set)
-        self.list_frame = ttk.Frame(self.canvas)
-        self.list_window = self.canvas.create_window((0, 0), window=self.list_frame, anchor="nw")
+        # 虚拟列表：只为可见范围内的文件创建/复用行控件
+        self.canvas.configure(yscrollcommand=self._on_list_yscroll)
         self.canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         self.scroll.pack(side=tk.RIGHT, fill=tk.Y)
 
-        self.list_frame.bind("<Configure>", lambda e: self.canvas.configure(scrollregion=self.canvas.bbox("all")))
         self.canvas.bind("<Configure>", self._on_canvas_configure)
 
         btn_bar = ttk.Frame(work_panel)
@@ -235,6 +540,12 @@ class WatermarkGUI:
         self.quality_scale = ttk.Scale(q_row, from_=0, to=100, orient=tk.HORIZONTAL, command=self._on_quality_change)
         self.quality_scale.set(95)
         self.quality_scale.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=6)
+        png_row = ttk.Frame(fmt_group)
+        png_row.pack(fill=tk.X, pady=4)
+        ttk.Label(png_row, text="PNG压缩级别:").pack(side=tk.LEFT)
+        self.png_level_var = tk.IntVar(value=6)
+        ttk.Spinbox(png_row, from_=0, to=9, textvariable=self.png_level_var, width=5).pack(side=tk.LEFT, padx=4)
+        ttk.Label(png_row, text="（越小越快、文件越大）").pack(side=tk.LEFT)
 
         # 命名
         name_group = ttk.LabelFrame(right, text="命名规则")
@@ -310,7 +621,7 @@ class WatermarkGUI:
         self.start_btn = ttk.Button(action, text="开始导出", command=self.start_export)
         self.start_btn.pack(side=tk.LEFT)
 
-        self.status_var = tk.StringVar(value="就绪")
+        self.status_var = tk.StringVar(value="就绪" if _has_pillow_simd() else "就绪（未安装 Pillow-SIMD，缩放较慢，可参考 README 安装）")
         ttk.Label(right, textvariable=self.status_var).pack(anchor=tk.W, padx=12)
 
         # 模板管理
@@ -334,6 +645,8 @@ class WatermarkGUI:
         # 窗口尺寸变化时重绘预览
         try:
             self.root.bind('<Configure>', lambda e: self.update_preview())
+            # 从最小化恢复/首次显示时补一次预览
+            self.root.bind('<Map>', lambda e: self.update_preview())
         except Exception:
             pass
         # 初始设置分割条位置：预览canvas、工作区、工具栏三等分
@@ -362,6 +675,12 @@ class WatermarkGUI:
         self.root.after(120, _set_main_split)
         self.root.after(130, _set_left_split)
 
+    def _get_watermark(self):
+        if self.watermark is None:
+            from photo_watermark import PhotoWatermark
+            self.watermark = PhotoWatermark()
+        return self.watermark
+
     def _bind_dnd_if_available(self):
         if not DND_AVAILABLE:
             return
@@ -373,7 +692,6 @@ class WatermarkGUI:
     def _read_templates_store(self):
         try:
             if self._templates_path.exists():
-                import json
                 with open(self._templates_path, 'r', encoding='utf-8') as f:
                     data = json.load(f)
                 if isinstance(data, dict) and 'templates' in data:
@@ -384,9 +702,7 @@ class WatermarkGUI:
 
     def _write_templates_store(self, data):
         try:
-            import json
-            with open(self._templates_path, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
+            _write_json_atomic(self._templates_path, data)
         except Exception:
             pass
 
@@ -405,7 +721,6 @@ class WatermarkGUI:
 
     def _save_as_template(self):
         try:
-            from tkinter import simpledialog
             name = simpledialog.askstring("保存为模板", "请输入模板名称:", parent=self.root)
         except Exception:
             name = None
@@ -458,7 +773,6 @@ class WatermarkGUI:
     def _load_last_settings_or_default(self):
         # 尝试加载最近设置
         try:
-            import json
             if self._last_settings_path.exists():
                 with open(self._last_settings_path, 'r', encoding='utf-8') as f:
                     last = json.load(f)
@@ -476,12 +790,25 @@ class WatermarkGUI:
                 self._apply_options(tpl)
 
     def _on_close(self):
+        # 停止导出：取消尚未开始的文件，避免窗口关闭后进程仍在后台写完整批
+        self._closing.set()
+        export_pool = self._export_pool
+        if export_pool is not None:
+            try:
+                export_pool.shutdown(wait=False, cancel_futures=True)
+            except Exception:
+                pass
+        # 停止后台缩略图任务
+        try:
+            self._thumb_pool.shutdown(wait=False, cancel_futures=True)
+            self._proc_pool.shutdown(wait=False, cancel_futures=True)
+            self._scan_pool.shutdown(wait=False, cancel_futures=True)
+            self._preview_pool.shutdown(wait=False, cancel_futures=True)
+        except Exception:
+            pass
         # 保存最近设置
         try:
-            import json
-            opts = self._gather_options()
-            with open(self._last_settings_path, 'w', encoding='utf-8') as f:
-                json.dump(opts, f, ensure_ascii=False, indent=2)
+            _write_json_atomic(self._last_settings_path, self._gather_options())
         except Exception:
             pass
         try:
@@ -490,7 +817,11 @@ class WatermarkGUI:
             pass
 
     def _on_canvas_configure(self, event):
-        self.canvas.itemconfig(self.list_window, width=event.width)
+        self._schedule_viewport_refresh()
+
+    def _on_list_yscroll(self, first, last):
+        self.scroll.set(first, last)
+        self._schedule_viewport_refresh()
 
     def add_files_dialog(self):
         paths = filedialog.askopenfilenames(title="选择图片", filetypes=[("Images", "*.jpg;*.jpeg;*.png;*.tif;*.tiff;*.bmp")])
@@ -500,85 +831,307 @@ class WatermarkGUI:
     def add_folder_dialog(self):
         path = filedialog.askdirectory(title="选择文件夹")
         if path:
-            files = self._collect_images_in_dir(Path(path))
-            self.add_paths(files)
+            self._enqueue_ingest(self._iter_images(path))
 
     def _on_drop(self, event):
         data = event.data
         # Windows 路径可能包含空格，tkdnd 用空格分隔，带大括号包裹
         raw = self.root.splitlist(data)
-        paths = [Path(p) for p in raw]
-        expanded = []
-        for p in paths:
-            if p.is_dir():
-                expanded.extend(self._collect_images_in_dir(p))
+        # 立即返回，让系统结束拖放操作；目录展开在后台线程中进行
+        self._enqueue_ingest(self._iter_dropped(raw))
+
+    def _enqueue_ingest(self, paths):
+        self._scan_pool.submit(self._scan_worker, paths)
+
+    def _scan_worker(self, paths):
+        # 后台线程：遍历路径迭代器（含目录扫描），按批放入队列，不触碰 Tk
+        it = iter(paths)
+        try:
+            while True:
+                batch = list(islice(it, INGEST_BATCH))
+                if not batch:
+                    break
+                self._paths_q.put(batch)
+        except Exception:
+            pass
+
+    def _drain_paths_queue(self):
+        # 主线程：合并本周期内已到达的若干批，一次交给 add_paths
+        try:
+            paths = []
+            for _ in range(INGEST_BATCHES_PER_TICK):
+                try:
+                    paths.extend(self._paths_q.get_nowait())
+                except queue.Empty:
+                    break
+            if paths:
+                self.add_paths(paths)
+        finally:
+            try:
+                self.root.after(INGEST_DRAIN_MS, self._drain_paths_queue)
+            except Exception:
+                pass
+
+    def _iter_dropped(self, raw):
+        # 逐个展开拖入的路径：目录递归遍历，文件原样产出
+        # 同一父目录下拖入较多条目时，对父目录 scandir 一次，用目录项缓存的类型代替逐个 stat
+        # 目录项按父目录下的文件名查找，不依赖拖入路径的分隔符写法（Windows 下 / 与 \ 混用）
+        groups = {}
+        for p in raw:
+            groups.setdefault(os.path.dirname(p), []).append(p)
+        entries = {}
+        for parent, items in groups.items():
+            if len(items) < DROP_SCANDIR_MIN:
+                continue
+            try:
+                with os.scandir(parent or '.') as it:
+                    entries[parent] = {entry.name: entry for entry in it}
+            except OSError:
+                continue
+        for p in raw:
+            names = entries.get(os.path.dirname(p))
+            entry = names.get(os.path.basename(p)) if names is not None else None
+            try:
+                is_dir = entry.is_dir() if entry is not None else os.path.isdir(p)
+            except OSError:
+                is_dir = False
+            if is_dir:
+                yield from self._iter_images(p)
             else:
-                expanded.append(str(p))
-        self.add_paths(expanded)
+                yield p
 
-    def _collect_images_in_dir(self, directory: Path):
-        results = []
-        for ext in SUPPORTED_EXTS:
-            results.extend([str(p) for p in directory.glob(f"**/*{ext}")])
-            results.extend([str(p) for p in directory.glob(f"**/*{ext.upper()}")])
-        return results
+    def _iter_images(self, root):
+        """单次 os.scandir 递归遍历目录，按小写扩展名过滤，逐个产出图片路径(str)"""
+        stack = [str(root)]
+        while stack:
+            try:
+                with os.scandir(stack.pop()) as it:
+                    for entry in it:
+                        # is_dir/is_file 使用 readdir 缓存的类型信息，无需额外 stat；
+                        # 目录不跟随符号链接（避免环），文件跟随（与 glob 一致，链接的照片照常导入）
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+                        elif entry.is_file():
+                            name = entry.name
+                            # 大小写混写（如 .Jpg）时才退回 lower()
+                            if name.endswith(_EXT_CASED) or name.lower().endswith(_EXT_SUFFIXES):
+                                yield entry.path
+            except OSError:
+                continue
 
     def add_paths(self, paths):
         added = 0
         for path in paths:
-            p = str(Path(path).resolve())
-            if p in self.files:
+            # abspath/normcase 只做字符串规范化，不触发文件系统调用
+            p = os.path.abspath(path)
+            key = os.path.normcase(p)
+            if key in self._files_set:
                 continue
-            if Path(p).suffix.lower() not in SUPPORTED_EXTS:
+            if not p.lower().endswith(_EXT_SUFFIXES):
                 continue
             self.files.append(p)
-            self._add_thumbnail_item(p)
+            self._files_set.add(key)
             added += 1
         if added:
+            self._schedule_viewport_refresh()
             self.status_var.set(f"已添加 {added} 个文件，总计 {len(self.files)}")
 
-    def _add_thumbnail_item(self, path: str):
-        item = ttk.Frame(self.list_frame)
-        item.pack(fill=tk.X, padx=8, pady=6)
-        # 缩略图
+    # ------- 虚拟列表 -------
+    def _new_row(self):
+        """在列表画布上创建一组可复用的行图元（背景 + 缩略图 + 文件名 + 移除按钮）"""
+        tag = f"row{len(self._row_pool)}"
+        row = {'path': None, 'tag': tag}
+        c = self.canvas
+        opts = {'tags': (tag,), 'state': "hidden"}
+        # 背景矩形作为整行的点击区域
+        row['bg'] = c.create_rectangle(0, 0, 0, 0, fill=c.cget('bg'), outline="", **opts)
+        row['img'] = c.create_image(0, 0, anchor="nw", **opts)
+        row['status'] = c.create_text(0, 0, text="加载中...", anchor="center", **opts)
+        row['name'] = c.create_text(0, 0, text="", anchor="w", **opts)
+        btn = ttk.Button(c, text="移除", command=lambda: self._remove_path(row['path']))
+        row['btn'] = c.create_window(0, 0, window=btn, anchor="e", **opts)
+        def on_select(*_):
+            if row['path']:
+                self.selected_file = row['path']
+                self.update_preview()
+        c.tag_bind(tag, "<Button-1>", on_select)
+        return row
+
+    def _place_row(self, row, idx, cw):
+        c = self.canvas
+        y = idx * ROW_HEIGHT + 6
+        mid = y + THUMB_SIZE // 2
+        c.coords(row['bg'], 4, y - 2, cw - 4, y + ROW_HEIGHT - 10)
+        c.coords(row['img'], 8, y)
+        c.coords(row['status'], 8 + THUMB_SIZE // 2, mid)
+        c.coords(row['name'], 8 + THUMB_SIZE + 12, mid)
+        c.coords(row['btn'], cw - 8, mid)
+        c.itemconfigure(row['tag'], state="normal")
+
+    def _schedule_viewport_refresh(self):
+        # 合并同一轮事件中的多次刷新（批量添加、滚动、尺寸变化），空闲时只计算一次
+        if self._viewport_pending:
+            return
+        self._viewport_pending = True
+        self.root.after_idle(self._flush_viewport_refresh)
+
+    def _flush_viewport_refresh(self):
+        self._viewport_pending = False
+        self._refresh_viewport()
+
+    def _refresh_viewport(self):
+        """根据滚动位置把行池分配给可见范围内的文件"""
+        if self._in_refresh:
+            return
+        self._in_refresh = True
         try:
-            im = Image.open(path)
-            im.thumbnail((120, 120), Image.LANCZOS)
-            photo = ImageTk.PhotoImage(im)
-            self.thumbnails[path] = photo
-            tk.Label(item, image=photo).pack(side=tk.LEFT)
+            cw = max(1, self.canvas.winfo_width())
+            ch = max(1, self.canvas.winfo_height())
+            total_h = len(self.files) * ROW_HEIGHT
+            region = (0, 0, cw, max(total_h, ch))
+            if self._scrollregion != region:
+                self._scrollregion = region
+                self.canvas.configure(scrollregion=region)
+            top = int(self.canvas.yview()[0] * region[3]) if total_h else 0
+            first = max(0, top // ROW_HEIGHT)
+            visible = ch // ROW_HEIGHT + 2
+            while len(self._row_pool) < visible:
+                self._row_pool.append(self._new_row())
+            for i, row in enumerate(self._row_pool):
+                idx = first + i
+                if i >= visible or idx >= len(self.files):
+                    if row['path'] is not None:
+                        row['path'] = None
+                        self.canvas.itemconfigure(row['tag'], state="hidden")
+                    continue
+                path = self.files[idx]
+                self._place_row(row, idx, cw)
+                if row['path'] != path:
+                    row['path'] = path
+                    self.canvas.itemconfigure(row['name'], text=os.path.basename(path))
+                    self._show_row_thumb(row)
+        finally:
+            self._in_refresh = False
+
+    def _show_row_thumb(self, row):
+        path = row['path']
+        photo = self.thumbnails.get(path)
+        if photo is None and self._thumb_blobs.get(path) is not None:
+            from PIL import Image, ImageTk
+            try:
+                with Image.open(io.BytesIO(self._thumb_blobs[path])) as im:
+                    photo = ImageTk.PhotoImage(im)
+                self.thumbnails[path] = photo
+            except Exception:
+                self._thumb_blobs[path] = None
+                # 磁盘缓存中的文件已损坏：删除，下次重新生成
+                try:
+                    _thumb_cache_path(path).unlink()
+                except Exception:
+                    pass
+        c = self.canvas
+        if photo is not None:
+            c.itemconfigure(row['img'], image=photo)
+            c.itemconfigure(row['status'], text="")
+        elif path in self._thumb_blobs:
+            c.itemconfigure(row['img'], image="")
+            c.itemconfigure(row['status'], text="预览失败")
+        else:
+            c.itemconfigure(row['img'], image="")
+            c.itemconfigure(row['status'], text="加载中...")
+            self._request_thumb(path)
+
+    def _on_thumb_evicted(self, path):
+        # PhotoImage 被回收后 Tk 图像随之删除，清掉仍引用它的行
+        for row in self._row_pool:
+            if row['path'] == path:
+                self.canvas.itemconfigure(row['img'], image="")
+                row['path'] = None
+                self._schedule_viewport_refresh()
+
+    def _request_thumb(self, path):
+        if path in self._thumb_futures:
+            return
+        if os.path.splitext(path)[1].lower() in PROC_THUMB_EXTS:
+            pool = self._proc_pool
+        else:
+            pool = self._thumb_pool
+        fut = pool.submit(_thumb_worker, path)
+        self._thumb_futures[path] = fut
+        fut.add_done_callback(lambda f, p=path: self._enqueue_thumb(p, f))
+
+    def _cancel_thumb(self, path):
+        # 取消尚未开始的解码任务（已在运行的任务结果会在 _apply_thumb 中被丢弃）
+        fut = self._thumb_futures.pop(path, None)
+        if fut is not None:
+            fut.cancel()
+
+    def _enqueue_thumb(self, path, fut):
+        # 在工作线程回调中调用，只入队，不触碰 Tk
+        if fut.cancelled():
+            return
+        try:
+            raw = fut.result()
         except Exception:
-            tk.Label(item, text="预览失败", width=16, anchor=tk.CENTER).pack(side=tk.LEFT)
-
-        # 文件名
-        name = os.path.basename(path)
-        lab = ttk.Label(item, text=name)
-        lab.pack(side=tk.LEFT, padx=8)
-        def on_select(*_):
-            self.selected_file = path
-            self.update_preview()
-        item.bind("<Button-1>", on_select)
-        lab.bind("<Button-1>", on_select)
+            raw = None
+        self._thumb_q.put((path, raw))
 
-        # 删除按钮
-        ttk.Button(item, text="移除", command=lambda: self._remove_item(item, path)).pack(side=tk.RIGHT)
+    def _drain_thumb_queue(self):
+        # 主线程：每个周期最多取回一批结果，合并为一次布局
+        try:
+            for _ in range(THUMB_DRAIN_BATCH):
+                try:
+                    path, raw = self._thumb_q.get_nowait()
+                except queue.Empty:
+                    break
+                self._apply_thumb(path, raw)
+        finally:
+            try:
+                self.root.after(THUMB_DRAIN_MS, self._drain_thumb_queue)
+            except Exception:
+                pass
 
-    def _remove_item(self, frame, path):
+    def _apply_thumb(self, path, raw):
+        # 主线程：只保存压缩字节，仅对当前可见行解码并创建 PhotoImage
+        self._thumb_futures.pop(path, None)
+        if os.path.normcase(path) not in self._files_set:
+            return
+        blob = None
+        if raw is not None:
+            blob, exif_mtime_ns, exif_dt = raw
+            if exif_mtime_ns is not None:
+                self._exif_cache[path] = (exif_mtime_ns, exif_dt)
+        self._thumb_blobs[path] = blob
         try:
-            frame.destroy()
+            for row in self._row_pool:
+                if row['path'] == path:
+                    self._show_row_thumb(row)
         except Exception:
             pass
-        if path in self.files:
+
+    def _remove_path(self, path):
+        if path is None:
+            return
+        key = os.path.normcase(path)
+        if key in self._files_set:
             self.files.remove(path)
-        if path in self.thumbnails:
-            del self.thumbnails[path]
+            self._files_set.discard(key)
+        self._cancel_thumb(path)
+        self.thumbnails.pop(path, None)
+        self._thumb_blobs.pop(path, None)
+        self._exif_cache.pop(path, None)
+        self._schedule_viewport_refresh()
         self.status_var.set(f"已移除。剩余 {len(self.files)}")
 
     def clear_files(self):
-        for child in list(self.list_frame.children.values()):
-            child.destroy()
+        for path in list(self._thumb_futures):
+            self._cancel_thumb(path)
         self.files.clear()
+        self._files_set.clear()
         self.thumbnails.clear()
+        self._thumb_blobs.clear()
+        self._exif_cache.clear()
+        self._schedule_viewport_refresh()
         self.status_var.set("已清空列表")
 
     def choose_output_dir(self):
@@ -598,7 +1151,6 @@ class WatermarkGUI:
 
     def pick_color(self, var: tk.StringVar):
         try:
-            from tkinter import colorchooser
             c = colorchooser.askcolor()
             if c and c[1]:
                 var.set(c[1])
@@ -606,9 +1158,17 @@ class WatermarkGUI:
             pass
 
     def _on_quality_change(self, value):
+        # 拖动时每个像素都会回调，只记录最新值，空闲时统一刷新标签
+        scheduled = self._q_pending is not None
+        self._q_pending = value
+        if not scheduled:
+            self.root.after_idle(self._flush_quality)
+
+    def _flush_quality(self):
+        value, self._q_pending = self._q_pending, None
         try:
             if hasattr(self, 'quality_label') and self.quality_label:
-                self.quality_label.config(text=str(int(float(value))))
+                self.quality_label.config(text=str(round(float(value))))
         except Exception:
             pass
 
@@ -621,100 +1181,136 @@ class WatermarkGUI:
             messagebox.showwarning("提示", "请选择输出目录")
             return
 
-        opts = self._gather_options()
+        try:
+            opts = self._gather_options(strict=True)
+        except ValueError as e:
+            messagebox.showerror("错误", str(e))
+            return
+        watermark = self._get_watermark()
+        from photo_watermark import _run_job
+
+        files = list(self.files)
+        # 缩略图阶段读到的拍摄时间交给水印实例，由 build_batch_jobs 随任务下发（文件被修改过则不命中）
+        watermark.exif_cache.update({(p, m): dt for p, (m, dt) in self._exif_cache.items()})
+        # 各子进程只看到单个文件，输出目录安全检查需在分发前对整批完成
+        if not opts['allow_same_dir'] and watermark.is_export_to_input(files, opts['output_dir']):
+            messagebox.showwarning("提示", "为防止覆盖原图，禁止导出到原文件夹，请选择其他输出目录")
+            return
 
         self.start_btn.config(state=tk.DISABLED)
         self.status_var.set("正在处理，请稍候...")
+        self.root.after(EXPORT_POLL_MS, self._poll_export_progress)
 
         def run():
+            # 后台线程：不直接操作 Tk，进度与结果经 _export_q 交回主线程
             try:
-                # 计算导出时的手动相对坐标直接传递
-                self.watermark.process_files(
-                    files=self.files,
-                    output_dir=opts['output_dir'],
-                    font_size=opts['font_size'],
-                    color=opts['color'],
-                    position=opts['position'],
-                    output_format=opts['output_format'],
-                    jpeg_quality=opts['jpeg_quality'],
-                    name_prefix=opts['name_prefix'],
-                    name_suffix=opts['name_suffix'],
-                    forbid_export_to_input=(not opts['allow_same_dir']),
-                    resize_width=opts['resize_width'],
-                    resize_height=opts['resize_height'],
-                    resize_percent=opts['resize_percent'],
-                    text_content=opts['text_content'],
-                    text_font_size=opts['text_font_size'],
-                    text_color=opts['text_color'],
-                    text_opacity=opts['text_opacity'],
-                    font_path=opts['font_path'],
-                    text_stroke_width=opts['text_stroke_width'],
-                    text_stroke_color=opts['text_stroke_color'],
-                    text_shadow=opts['text_shadow'],
-                    text_shadow_offset=opts['text_shadow_offset'],
-                    text_shadow_color=opts['text_shadow_color'],
-                    text_shadow_opacity=opts['text_shadow_opacity'],
-                    logo_path=opts['logo_path'],
-                    logo_scale_percent=opts['logo_scale_percent'],
-                    logo_width=opts['logo_width'],
-                    logo_height=opts['logo_height'],
-                    logo_opacity=opts['logo_opacity'],
-                    rotation_angle=opts['rotation_angle'],
-                    use_manual_position=opts['use_manual_position'],
-                    manual_pos_rel=opts['manual_pos_rel'],
-                )
-                self.status_var.set("处理完成")
-                messagebox.showinfo("完成", "导出完成！")
+                Path(opts['output_dir']).mkdir(parents=True, exist_ok=True)
+                # 与 CLI 批处理共用任务构造与 _run_job（每个子进程复用一个 PhotoWatermark 实例）
+                jobs = watermark.build_batch_jobs(files, opts['output_dir'], opts['name_prefix'], opts['name_suffix'],
+                                                  **_watermark_kwargs(opts))
+                total = len(jobs)
+                success = 0
+                workers = os.cpu_count() or 1
+                # 每个文件相互独立：逐个分发到进程池，每个进程只在途一个文件，
+                # 窗口关闭（可能早于进程池创建）后不再分发，关闭时最多只需等各进程手头的一张完成
+                with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as ex:
+                    self._export_pool = ex
+                    try:
+                        pending = set()
+                        it = iter(jobs)
+                        done = 0
+                        while not self._closing.is_set():
+                            while len(pending) < workers:
+                                job = next(it, None)
+                                if job is None:
+                                    break
+                                pending.add(ex.submit(_run_job, job))
+                            if not pending:
+                                break
+                            finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                            for fut in finished:
+                                ok, _err = fut.result()
+                                done += 1
+                                if ok:
+                                    success += 1
+                                self._export_q.put(('progress', done, total))
+                    finally:
+                        self._export_pool = None
+                if self._closing.is_set():
+                    return
+                self._export_q.put(('done', success, total))
             except Exception as e:
-                messagebox.showerror("错误", f"导出失败: {e}")
-            finally:
-                self.start_btn.config(state=tk.NORMAL)
+                self._export_q.put(('error', str(e), None))
 
         threading.Thread(target=run, daemon=True).start()
 
-    def _gather_options(self):
+    def _poll_export_progress(self):
+        # 主线程：消费导出线程的进度消息，结束时弹窗并恢复按钮
+        finished = False
+        try:
+            while True:
+                kind, a, b = self._export_q.get_nowait()
+                if kind == 'progress':
+                    self.status_var.set(f"正在处理 {a}/{b} ...")
+                elif kind == 'done':
+                    finished = True
+                    self.status_var.set(f"处理完成：成功 {a}/{b}")
+                    messagebox.showinfo("完成", "导出完成！")
+                else:
+                    finished = True
+                    self.status_var.set("导出失败")
+                    messagebox.showerror("错误", f"导出失败: {a}")
+        except queue.Empty:
+            pass
+        if finished:
+            self.start_btn.config(state=tk.NORMAL)
+        else:
+            self.root.after(EXPORT_POLL_MS, self._poll_export_progress)
+
+    def _gather_options(self, strict=False):
+        # strict=True 时尺寸输入框非空但非法即抛 ValueError，供导出前快速失败
+        if strict:
+            for label, var, parse in (("宽度", self.resize_w_var, _parse_int),
+                                      ("高度", self.resize_h_var, _parse_int),
+                                      ("百分比", self.resize_p_var, _parse_float)):
+                text = var.get().strip()
+                value = parse(text)
+                if text and (value is None or value <= 0):
+                    raise ValueError(f"尺寸{label}无效: {text}")
         fmt = self.format_var.get()
         output_format = None if fmt == 'auto' else fmt
-        # 尺寸输入
-        rw = self.resize_w_var.get().strip()
-        rh = self.resize_h_var.get().strip()
-        rp = self.resize_p_var.get().strip()
-        rw_i = int(rw) if rw.isdigit() else None
-        rh_i = int(rh) if rh.isdigit() else None
-        try:
-            rp_f = float(rp) if rp else None
-        except Exception:
-            rp_f = None
+        # Scale.get() 返回浮点数，四舍五入避免 94.9 被截断为 94
         return {
             'output_dir': self.output_dir_var.get().strip(),
             'allow_same_dir': bool(self.allow_same_dir_var.get()),
             'output_format': output_format,
-            'jpeg_quality': int(self.quality_scale.get()),
+            'jpeg_quality': round(self.quality_scale.get()),
+            'png_compress_level': max(0, min(9, int(self.png_level_var.get()))),
             'name_prefix': self.prefix_var.get(),
             'name_suffix': self.suffix_var.get(),
-            'resize_width': rw_i,
-            'resize_height': rh_i,
-            'resize_percent': rp_f,
+            'resize_width': _parse_int(self.resize_w_var.get()),
+            'resize_height': _parse_int(self.resize_h_var.get()),
+            'resize_percent': _parse_float(self.resize_p_var.get()),
             'font_size': int(self.font_size_var.get()),
             'text_font_size': int(self.text_font_size_var.get()),
             'color': self.color_var.get().strip() or 'white',
             'position': self.position_var.get(),
             'text_content': self.text_content_var.get().strip() or None,
             'text_color': self.text_color_var.get().strip() or 'white',
-            'text_opacity': int(self.text_opacity_scale.get()),
+            'text_opacity': round(self.text_opacity_scale.get()),
             'font_path': self.font_path_var.get().strip() or None,
             'text_stroke_width': int(self.stroke_width_var.get()),
             'text_stroke_color': self.stroke_color_var.get().strip() or 'black',
             'text_shadow': bool(self.shadow_var.get()),
             'text_shadow_offset': int(self.shadow_offset_var.get()),
             'text_shadow_color': self.shadow_color_var.get().strip() or 'black',
-            'text_shadow_opacity': int(self.shadow_opacity_scale.get()),
+            'text_shadow_opacity': round(self.shadow_opacity_scale.get()),
             'logo_path': self.logo_path_var.get().strip() or None,
-            'logo_scale_percent': float(self.logo_scale_var.get()) if self.logo_scale_var.get().strip() else None,
-            'logo_width': int(self.logo_w_var.get()) if self.logo_w_var.get().strip().isdigit() else None,
-            'logo_height': int(self.logo_h_var.get()) if self.logo_h_var.get().strip().isdigit() else None,
-            'logo_opacity': int(self.logo_opacity_scale.get()),
-            'rotation_angle': int(float(self.rotation_scale.get())),
+            'logo_scale_percent': _parse_float(self.logo_scale_var.get()),
+            'logo_width': _parse_int(self.logo_w_var.get()),
+            'logo_height': _parse_int(self.logo_h_var.get()),
+            'logo_opacity': round(self.logo_opacity_scale.get()),
+            'rotation_angle': round(float(self.rotation_scale.get())),
             'use_manual_position': bool(self._has_manual),
             'manual_pos_rel': self.manual_pos_rel,
         }
@@ -731,6 +1327,7 @@ class WatermarkGUI:
                 self.quality_scale.set(int(opts['jpeg_quality']))
                 if hasattr(self, 'quality_label'):
                     self.quality_label.config(text=str(int(opts['jpeg_quality'])))
+            if 'png_compress_level' in opts: self.png_level_var.set(int(opts['png_compress_level']))
             if 'name_prefix' in opts: self.prefix_var.set(opts['name_prefix'] or '')
             if 'name_suffix' in opts: self.suffix_var.set(opts['name_suffix'] or '')
 
@@ -820,80 +1417,152 @@ class WatermarkGUI:
 
 
     def update_preview(self):
+        # 合并短时间内的多次请求：取消尚未执行的重绘，只保留最后一次
+        if self._preview_after is not None:
+            try:
+                self.root.after_cancel(self._preview_after)
+            except Exception:
+                pass
+        self._preview_after = self.root.after(PREVIEW_DEBOUNCE_MS, self._render_preview)
+
+    def _render_preview(self):
+        # 主线程：只收集参数并交给预览线程，合成完成后由 _poll_preview 显示
+        self._preview_after = None
         if not self.selected_file:
+            self._preview_gen += 1
+            self._preview_last_key = None
             self.preview_canvas.delete("all")
+            self._preview_item = None
+            return
+        # 画布尚未显示、尺寸未确定或窗口已最小化时不渲染，等 <Map>/<Configure> 再触发
+        cw = int(self.preview_canvas.winfo_width())
+        ch = int(self.preview_canvas.winfo_height())
+        if cw <= 1 or ch <= 1 or not self.preview_canvas.winfo_ismapped() or self.root.state() == 'iconic':
             return
-        # 构造参数并渲染
         opts = self._gather_options()
+        # 只比较影响预览的选项：命名、格式、输出目录等变化不必重绘
+        key = (self.selected_file, cw, ch, {k: v for k, v in opts.items() if k not in _PREVIEW_IGNORED_OPTS})
+        if key == self._preview_last_key:
+            return
+        self._preview_last_key = key
+        self._preview_gen += 1
+        gen = self._preview_gen
+        fut = self._preview_pool.submit(self._compose_preview, gen, self.selected_file, opts, cw, ch)
+        fut.add_done_callback(lambda f: self._preview_q.put((gen, f)))
+        self._preview_inflight += 1
+        if self._preview_inflight == 1:
+            self.root.after(PREVIEW_POLL_MS, self._poll_preview)
+
+    def _poll_preview(self):
+        # 主线程：取回预览结果，只显示最新一次请求的画面
+        latest = None
         try:
-            # 按导出尺寸逻辑先对原图缩放
-            im = Image.open(self.selected_file)
-            # 应用导出尺寸（与导出一致）
-            rw = opts['resize_width']; rh = opts['resize_height']; rp = opts['resize_percent']
-            if rw or rh or rp:
-                try:
-                    disp_src = self.watermark.apply_resize(im, width=rw, height=rh, percent=rp)
-                except Exception:
-                    disp_src = im
-            else:
-                disp_src = im
+            while True:
+                gen, fut = self._preview_q.get_nowait()
+                self._preview_inflight -= 1
+                if gen == self._preview_gen:
+                    latest = fut
+        except queue.Empty:
+            pass
+        if latest is not None:
+            try:
+                result = latest.result()
+                if result is not None:
+                    from PIL import ImageTk
+                    disp, self._preview_box = result
+                    photo = self._last_preview_tk
+                    if photo is not None and (photo.width(), photo.height()) == disp.size:
+                        # 尺寸未变：原地更新像素，不重新分配 Tk 图像
+                        photo.paste(disp)
+                    else:
+                        self._last_preview_tk = ImageTk.PhotoImage(disp)
+                    x, y = self._preview_box[:2]
+                    if self._preview_item is None:
+                        self._preview_item = self.preview_canvas.create_image(x, y, anchor=tk.NW, image=self._last_preview_tk)
+                    else:
+                        self.preview_canvas.coords(self._preview_item, x, y)
+                        self.preview_canvas.itemconfigure(self._preview_item, image=self._last_preview_tk)
+            except Exception:
+                pass
+        if self._preview_inflight > 0:
+            self.root.after(PREVIEW_POLL_MS, self._poll_preview)
+
+    def _compose_preview(self, gen, path, opts, cw, ch):
+        """预览线程：解码/缩放（带缓存）并合成水印，返回 (图片区域大小的 RGBA 图, 图像区域)
+
+        已有更新的请求时直接放弃，返回 None；不触碰 Tk。
+        """
+        if gen != self._preview_gen:
+            return None
+        from PIL import Image
+        watermark = self._get_watermark()
+        rw = opts['resize_width']; rh = opts['resize_height']; rp = opts['resize_percent']
+        src_key = (path, os.stat(path).st_mtime_ns)
+        fit_key = (src_key, rw, rh, rp, cw, ch)
+        if fit_key != self._preview_fit_key:
+            if src_key != self._preview_src_key:
+                with Image.open(path) as im:
+                    im.load()
+                    self._preview_src = im.copy()
+                self._preview_src_key = src_key
+            im = self._preview_src
+            # 按导出尺寸逻辑只计算目标宽高，不生成导出尺寸的中间图
+            try:
+                w, h = watermark.resized_size(im.size, width=rw, height=rh, percent=rp)
+            except Exception:
+                w, h = im.size
 
-            # 再将导出图缩放以适配预览画布（等比，留边）
-            cw = int(self.preview_canvas.winfo_width()) or 540
-            ch = int(self.preview_canvas.winfo_height()) or 360
-            w, h = disp_src.size
+            # 按导出图的宽高比适配预览画布（等比，留边），从原图一次缩放到位
             scale = min(cw / w, ch / h)
             nw, nh = max(1, int(w * scale)), max(1, int(h * scale))
             x = (cw - nw) // 2
             y = (ch - nh) // 2
-            base = Image.new('RGBA', (cw, ch), (51, 51, 51, 255))
-            prev_img = disp_src.resize((nw, nh), Image.LANCZOS)
-            self._preview_box = (x, y, nw, nh)
-
-            # 手动坐标换算为“缩放后图片内”的像素坐标
-            mrel = opts['manual_pos_rel'] if opts['use_manual_position'] else None
-            if mrel and self._preview_box:
-                _, _, bw, bh = self._preview_box
-                mx_img, my_img = int(mrel[0] * bw), int(mrel[1] * bh)
-            else:
-                mx_img = my_img = None
-
-            # 只在缩放后的图片上绘制水印，然后粘贴到背景
-            rendered = self.watermark.add_watermark_to_image(
-                prev_img,
-                image_path=self.selected_file,
-                font_size=opts['font_size'],
-                color=opts['color'],
-                position=opts['position'],
-                text_content=opts['text_content'],
-                text_font_size=opts['text_font_size'],
-                text_color=opts['text_color'],
-                text_opacity=opts['text_opacity'],
-                font_path=opts['font_path'],
-                text_stroke_width=opts['text_stroke_width'],
-                text_stroke_color=opts['text_stroke_color'],
-                text_shadow=opts['text_shadow'],
-                text_shadow_offset=opts['text_shadow_offset'],
-                text_shadow_color=opts['text_shadow_color'],
-                text_shadow_opacity=opts['text_shadow_opacity'],
-                logo_path=opts['logo_path'],
-                logo_scale_percent=opts['logo_scale_percent'],
-                logo_width=opts['logo_width'],
-                logo_height=opts['logo_height'],
-                logo_opacity=opts['logo_opacity'],
-                rotation_angle=opts['rotation_angle'],
-                use_manual_position=opts['use_manual_position'],
-                manual_xy=(mx_img, my_img) if mx_img is not None else None,
-            )
-            if rendered.mode != 'RGBA':
-                rendered = rendered.convert('RGBA')
-            base.alpha_composite(rendered, dest=(x, y))
-            disp = base
-            self._last_preview_tk = ImageTk.PhotoImage(disp)
-            self.preview_canvas.delete("all")
-            self.preview_canvas.create_image(0, 0, anchor=tk.NW, image=self._last_preview_tk)
-        except Exception:
-            pass
+            # 预览只需画布大小：reducing_gap 先按整数倍 reduce()，再用 BILINEAR 收尾
+            fit = im.resize((nw, nh), Image.Resampling.BILINEAR, reducing_gap=PREVIEW_REDUCING_GAP)
+            self._preview_fit = (fit, (x, y, nw, nh))
+            self._preview_fit_key = fit_key
+        # 参数变化时只在缓存的小图上重新合成水印
+        prev_img, box = self._preview_fit
+        x, y, bw, bh = box
+
+        # 手动坐标换算为“缩放后图片内”的像素坐标
+        mrel = opts['manual_pos_rel'] if opts['use_manual_position'] else None
+        if mrel:
+            mx_img, my_img = int(mrel[0] * bw), int(mrel[1] * bh)
+        else:
+            mx_img = my_img = None
+
+        # 只在缩放后的图片上绘制水印，然后粘贴到背景
+        rendered = watermark.add_watermark_to_image(
+            prev_img,
+            image_path=path,
+            font_size=opts['font_size'],
+            color=opts['color'],
+            position=opts['position'],
+            text_content=opts['text_content'],
+            text_font_size=opts['text_font_size'],
+            text_color=opts['text_color'],
+            text_opacity=opts['text_opacity'],
+            font_path=opts['font_path'],
+            text_stroke_width=opts['text_stroke_width'],
+            text_stroke_color=opts['text_stroke_color'],
+            text_shadow=opts['text_shadow'],
+            text_shadow_offset=opts['text_shadow_offset'],
+            text_shadow_color=opts['text_shadow_color'],
+            text_shadow_opacity=opts['text_shadow_opacity'],
+            logo_path=opts['logo_path'],
+            logo_scale_percent=opts['logo_scale_percent'],
+            logo_width=opts['logo_width'],
+            logo_height=opts['logo_height'],
+            logo_opacity=opts['logo_opacity'],
+            rotation_angle=opts['rotation_angle'],
+            use_manual_position=opts['use_manual_position'],
+            manual_xy=(mx_img, my_img) if mx_img is not None else None,
+        )
+        # 只返回图片区域；四周留边由画布自身的 #333 背景显示，无需整幅底图
+        if rendered.mode != 'RGBA':
+            rendered = rendered.convert('RGBA')
+        return rendered, box
 
     def run(self):
         self.root.mainloop()
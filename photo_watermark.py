@@ -5,40 +5,234 @@
 基于EXIF拍摄时间信息为图片添加水印
 """
 
+import io
 import os
 import sys
 import argparse
 from datetime import datetime
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor
 from PIL import Image, ImageDraw, ImageFont, ImageColor
 import piexif
 from pathlib import Path
 
 
+EXIF_DATETIME_FORMAT = '%Y:%m:%d %H:%M:%S'
+# 支持的输入扩展名（小写，比较前先把后缀转为小写）
+SUPPORTED_FORMATS = frozenset({'.jpg', '.jpeg', '.png', '.tiff', '.tif', '.bmp'})
+# 批量处理时进程池每次下发的任务数
+BATCH_CHUNKSIZE = 4
+# 输出扩展名规范化
+_EXT_ALIASES = {'jpg': 'jpeg'}
+# 导出 PNG 的默认 zlib 压缩级别（0-9，同 Pillow 默认）；批量导出可调低以体积换速度（1 约快数倍、体积大 15% 左右）
+PNG_COMPRESS_LEVEL = 6
+# 缩小时先用 reduce() 按整数倍快速缩到目标的 3 倍以内，再用 LANCZOS 精确缩放；3.0 时与直接 LANCZOS 肉眼无差别
+RESIZE_REDUCING_GAP = 3.0
+
+
+def exif_datetime_from_image(img):
+    """从已打开的 PIL.Image 读取拍摄时间（无需解码像素），没有则返回 None"""
+    try:
+        exif = img.getexif()
+        value = exif.get_ifd(piexif.ImageIFD.ExifTag).get(piexif.ExifIFD.DateTimeOriginal)
+        if not value:
+            value = exif.get(piexif.ImageIFD.DateTime)
+        if not value:
+            return None
+        if isinstance(value, bytes):
+            value = value.decode('utf-8')
+        return datetime.strptime(value.strip('\x00 '), EXIF_DATETIME_FORMAT)
+    except Exception:
+        return None
+
+
+SYSTEM_FONT_PATHS = [
+    # Windows 常见
+    "C:/Windows/Fonts/msyh.ttf",  # 微软雅黑
+    "C:/Windows/Fonts/simhei.ttf",  # 黑体
+    "C:/Windows/Fonts/arial.ttf",
+    # macOS 常见
+    "/System/Library/Fonts/PingFang.ttc",
+    "/System/Library/Fonts/STHeiti Light.ttc",
+    "/System/Library/Fonts/Helvetica.ttc",
+    # Linux 常见
+    "/usr/share/fonts/truetype/wqy/wqy-zenhei.ttc",
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+    # 相对路径/当前目录可能的字体
+    "arial.ttf",
+]
+
+
+@lru_cache(maxsize=None)
+def _system_font_path():
+    """返回第一个可加载的系统字体路径（只探测一次），都不可用时返回 None"""
+    for font_path in SYSTEM_FONT_PATHS:
+        try:
+            ImageFont.truetype(font_path, 12)
+            return font_path
+        except Exception:
+            continue
+    return None
+
+
+@lru_cache(maxsize=64)
+def _load_font(font_path, font_size):
+    """按 (路径, 字号) 缓存字体对象；font_path 为空或加载失败时回退到系统字体"""
+    if font_path:
+        try:
+            return ImageFont.truetype(font_path, font_size)
+        except Exception:
+            pass
+    system_path = _system_font_path()
+    if system_path:
+        try:
+            return ImageFont.truetype(system_path, font_size)
+        except Exception:
+            pass
+    # 最终回退
+    return ImageFont.load_default()
+
+
+def _normalize_mode(img, has_alpha):
+    """含透明通道的统一为 RGBA，其余非 RGB 模式（L、P、CMYK 等）转为 RGB；已是 RGB/RGBA 时原样返回"""
+    if has_alpha:
+        if img.mode != 'RGBA':
+            img = img.convert('RGBA')
+    elif img.mode not in ('RGB', 'RGBA'):
+        img = img.convert('RGB')
+    return img
+
+
+def _composite(img, layer, dest):
+    """把 RGBA 图层叠加到 img 上（原地）。
+
+    img 为 RGBA 时用 alpha_composite；无透明通道时用带蒙版的 paste，
+    结果相同，但不必把整幅图转换为 RGBA 再转回。layer 本身不透明（RGB）时直接整块 paste。
+    """
+    if layer.mode != 'RGBA':
+        img.paste(layer, dest)
+    elif img.mode == 'RGBA':
+        img.alpha_composite(layer, dest=dest)
+    else:
+        img.paste(layer, dest, layer)
+    return img
+
+
+@lru_cache(maxsize=256)
+def _text_size(text, font_path, font_size, stroke_width=0):
+    """测量文本包围盒 (w, h)，按 (文本, 字体, 字号, 描边) 缓存；同一天拍摄的照片日期文本相同可直接复用"""
+    font = _load_font(font_path, font_size)
+    bbox = ImageDraw.Draw(Image.new('RGB', (1, 1))).textbbox((0, 0), text, font=font, stroke_width=stroke_width)
+    return bbox[2] - bbox[0], bbox[3] - bbox[1]
+
+
+@lru_cache(maxsize=64)
+def _color_with_opacity(color_str, opacity_percent, fallback='white'):
+    """颜色字符串 + 不透明度(0-100) -> RGBA；整批照片参数相同，按参数缓存"""
+    try:
+        opacity = max(0, min(100, int(opacity_percent)))
+    except Exception:
+        opacity = 100
+    try:
+        rgb = ImageColor.getrgb(color_str)
+    except Exception:
+        rgb = (255, 255, 255) if fallback == 'white' else (0, 0, 0)
+    a = int(round(opacity / 100.0 * 255))
+    return (*rgb, a)
+
+
+@lru_cache(maxsize=16)
+def _prepared_logo(logo_path, mtime_ns, scale_percent=None, width=None, height=None, opacity=100, rotation_angle=0):
+    """按参数缓存处理好的 Logo（RGBA）。返回的图像被多张照片共享，调用方不得原地修改"""
+    if rotation_angle:
+        logo = _prepared_logo(logo_path, mtime_ns, scale_percent, width, height, opacity)
+        if logo is None:
+            return None
+        return logo.rotate(rotation_angle, expand=True, resample=Image.BICUBIC)
+    try:
+        with Image.open(logo_path) as f:
+            # 立即解码并关闭文件：缓存中的图像会被多个线程共享
+            f.load()
+            logo = f.copy()
+        if logo.mode != 'RGBA':
+            logo = logo.convert('RGBA')
+        lw, lh = logo.size
+        # 尺寸
+        if width and height:
+            logo = logo.resize((int(width), int(height)), Image.LANCZOS)
+        elif width:
+            tw = int(width)
+            th = max(1, int(lh * (tw / lw)))
+            logo = logo.resize((tw, th), Image.LANCZOS)
+        elif height:
+            th = int(height)
+            tw = max(1, int(lw * (th / lh)))
+            logo = logo.resize((tw, th), Image.LANCZOS)
+        elif scale_percent:
+            scale = float(scale_percent) / 100.0
+            tw = max(1, int(lw * scale))
+            th = max(1, int(lh * scale))
+            logo = logo.resize((tw, th), Image.LANCZOS)
+
+        # 透明度：只取 alpha 通道，用 256 项查找表在 C 中完成逐像素缩放
+        a = max(0, min(100, int(opacity)))
+        if a < 100:
+            lut = [int(p * (a / 100.0)) for p in range(256)]
+            logo.putalpha(logo.getchannel('A').point(lut))
+        return logo
+    except Exception:
+        return None
+
+
+@lru_cache(maxsize=16)
+def _paste_logo(logo_path, mtime_ns, scale_percent=None, width=None, height=None, opacity=100):
+    """完全不透明的 Logo 转为 RGB，合成时直接 paste 而无需逐像素混合；否则原样返回 RGBA"""
+    logo = _prepared_logo(logo_path, mtime_ns, scale_percent, width, height, opacity)
+    if logo is not None and logo.getchannel('A').getextrema()[0] == 255:
+        return logo.convert('RGB')
+    return logo
+
+
+def _exif_cache_key(image_path):
+    """拍摄时间缓存的键 (路径, 修改时间 ns)：文件被编辑或替换后自然失效；无法 stat 时返回 None"""
+    try:
+        return image_path, os.stat(image_path).st_mtime_ns
+    except (OSError, TypeError, ValueError):
+        return None
+
+
 class PhotoWatermark:
     def __init__(self):
-        self.supported_formats = {'.jpg', '.jpeg', '.png', '.tiff', '.tif', '.bmp'}
+        self.supported_formats = SUPPORTED_FORMATS
+        # 预读的拍摄时间：(image_path, st_mtime_ns) -> datetime 或 None（None 表示无 EXIF 时间）
+        self.exif_cache = {}
         
     def get_exif_datetime(self, image_path):
         """从图片EXIF信息中获取拍摄时间"""
+        key = _exif_cache_key(image_path)
+        if key in self.exif_cache:
+            return self.exif_cache[key]
         try:
-            exif_dict = piexif.load(image_path)
-            if 'Exif' in exif_dict:
-                # 尝试获取DateTimeOriginal
-                if piexif.ExifIFD.DateTimeOriginal in exif_dict['Exif']:
-                    datetime_str = exif_dict['Exif'][piexif.ExifIFD.DateTimeOriginal].decode('utf-8')
-                    return datetime.strptime(datetime_str, '%Y:%m:%d %H:%M:%S')
-                # 尝试获取DateTime
-                elif piexif.ExifIFD.DateTime in exif_dict['Exif']:
-                    datetime_str = exif_dict['Exif'][piexif.ExifIFD.DateTime].decode('utf-8')
-                    return datetime.strptime(datetime_str, '%Y:%m:%d %H:%M:%S')
-            return None
+            # 只读取文件头中的 EXIF，不解码像素
+            with Image.open(image_path) as img:
+                dt = exif_datetime_from_image(img)
+            # 记入缓存：预览反复重绘同一张图时不再重新打开文件
+            if key is not None:
+                self.exif_cache[key] = dt
+            return dt
         except Exception as e:
             print(f"读取EXIF信息失败 {image_path}: {e}")
             return None
     
-    def get_watermark_text(self, image_path):
-        """获取水印文本（基于拍摄时间）"""
-        dt = self.get_exif_datetime(image_path)
+    def get_watermark_text(self, image_path, img=None):
+        """获取水印文本（基于拍摄时间）
+
+        传入已打开的原图 img 时直接从中读取 EXIF，不再重新打开文件。
+        """
+        if img is not None and _exif_cache_key(image_path) not in self.exif_cache:
+            dt = exif_datetime_from_image(img)
+        else:
+            dt = self.get_exif_datetime(image_path)
         if dt:
             return dt.strftime('%Y年%m月%d日')
         else:
@@ -70,172 +264,218 @@ class PhotoWatermark:
                       font_path=None, text_stroke_width=0, text_stroke_color='black',
                       text_shadow=False, text_shadow_offset=2, text_shadow_color='black', text_shadow_opacity=60,
                       logo_path=None, logo_scale_percent=None, logo_width=None, logo_height=None, logo_opacity=100,
-                      rotation_angle=0, use_manual_position=False, manual_pos_rel=None):
-        """为图片添加水印并导出
+                      rotation_angle=0, use_manual_position=False, manual_pos_rel=None,
+                      png_compress_level=PNG_COMPRESS_LEVEL):
+        """为图片添加水印并导出（打开文件 -> watermark_image -> save_image）
 
         参数:
         - output_format: 可选 'jpeg' 或 'png'，不填则依据 output_path 后缀
         - jpeg_quality: 0-100，仅当输出为jpeg时生效
-        - resize_mode: 可选 'width' | 'height' | 'percent' | None
-        - resize_value: 对应的数值 (int 或 float)，如宽度像素/高度像素/百分比(0-100)
+        - png_compress_level: 0-9，仅当输出为png时生效，越小越快、文件越大
+        - resize_width/resize_height/resize_percent: 输出尺寸，规则见 apply_resize
         """
         try:
             # 打开图片
             with Image.open(image_path) as img:
-                # 记录是否含透明通道
-                has_alpha = (img.mode in ('RGBA', 'LA')) or ('transparency' in img.info)
-
-                # 尺寸调整（优先使用新参数，其次兼容旧模式）
-                img = self.apply_resize(img,
-                                        width=resize_width,
-                                        height=resize_height,
-                                        percent=resize_percent)
-                
-                # 创建绘图对象
-                # 若有透明通道，保证为 RGBA，便于在透明图层上绘制文本
-                if has_alpha:
-                    if img.mode != 'RGBA':
-                        img = img.convert('RGBA')
-                else:
-                    if img.mode not in ('RGB', 'RGBA'):
-                        img = img.convert('RGB')
-                draw = ImageDraw.Draw(img)
-                
-                # 规划线性输出：EXIF -> 文本 -> 图片，按位置锚点堆叠
-                exif_text = self.get_watermark_text(image_path)
-                base_font = self.get_font(font_size)
-                exif_bbox = draw.textbbox((0, 0), exif_text, font=base_font)
-                exif_w = exif_bbox[2] - exif_bbox[0]
-                exif_h = exif_bbox[3] - exif_bbox[1]
-
-                custom_font = None
-                custom_w = custom_h = 0
-                has_custom = bool(text_content)
-                if has_custom:
-                    csz = int(text_font_size) if text_font_size else font_size
-                    custom_font = self.get_font(csz) if not font_path else self.load_font(font_path, csz)
-                    custom_bbox = draw.textbbox((0, 0), text_content, font=custom_font, stroke_width=max(0, int(text_stroke_width)))
-                    custom_w = custom_bbox[2] - custom_bbox[0]
-                    custom_h = custom_bbox[3] - custom_bbox[1]
-
-                wm_img = None
-                logo_w = logo_h = 0
-                if logo_path:
-                    wm_img = self.prepare_logo(logo_path, logo_scale_percent, logo_width, logo_height, logo_opacity)
-                    if wm_img is not None:
-                        logo_w, logo_h = wm_img.size
-
-                # 计算堆叠位置
-                margin = 20
-                spacing = 8
-                pw, ph = img.width, img.height
-
-                def anchor_x(w):
-                    if position.endswith('left') or position == 'left':
-                        return margin
-                    if position.endswith('right') or position == 'right':
-                        return pw - w - margin
-                    return (pw - w) // 2
-
-                # 垂直布局依据 position
-                blocks = []
-                # 依次添加：exif, custom text, logo(若有)
-                blocks.append(('exif', exif_w, exif_h))
-                if has_custom:
-                    blocks.append(('custom', custom_w, custom_h))
-                if wm_img is not None:
-                    blocks.append(('logo', logo_w, logo_h))
-
-                total_h = sum(h for _, _, h in blocks) + spacing * (len(blocks) - 1 if blocks else 0)
-                if position.startswith('top'):
-                    cur_y = margin
-                elif position.startswith('bottom'):
-                    cur_y = ph - margin - total_h
-                else:  # center 垂直居中
-                    cur_y = (ph - total_h) // 2
-
-                # 绘制各块（支持整体旋转和手动定位）
-                try:
-                    rotation_angle = int(rotation_angle)
-                except Exception:
-                    rotation_angle = 0
-                manual_xy = None
-                if use_manual_position and manual_pos_rel:
+                # 明显缩小的 JPEG 让解码器直接按 1/2~1/8 解码，留 2 倍余量再精确缩放
+                if img.format == 'JPEG' and (resize_width or resize_height or resize_percent):
                     try:
-                        rx, ry = manual_pos_rel
-                        manual_xy = (int(rx * pw), int(ry * ph))
+                        tw, th = self.resized_size(img.size, resize_width, resize_height, resize_percent)
+                        if tw * 2 <= img.width and th * 2 <= img.height:
+                            img.draft(img.mode, (tw * 2, th * 2))
+                            resize_width, resize_height, resize_percent = tw, th, None
                     except Exception:
-                        manual_xy = None
-
-                offset_y = 0
-                for kind, w, h in blocks:
-                    x = anchor_x(w)
-                    draw_x = manual_xy[0] if manual_xy else x
-                    draw_y = (manual_xy[1] + offset_y) if manual_xy else cur_y
-                    if kind == 'exif':
-                        if rotation_angle:
-                            layer = Image.new('RGBA', (w, h), (0, 0, 0, 0))
-                            ImageDraw.Draw(layer).text((0, 0), exif_text, fill=color, font=base_font)
-                            layer = layer.rotate(rotation_angle, expand=True, resample=Image.BICUBIC)
-                            if img.mode != 'RGBA':
-                                img = img.convert('RGBA')
-                            img.alpha_composite(layer, dest=(draw_x, draw_y))
-                        else:
-                            draw.text((draw_x, draw_y), exif_text, fill=color, font=base_font)
-                    elif kind == 'custom':
-                        if rotation_angle:
-                            bbox_img = Image.new('RGBA', (w, h), (0, 0, 0, 0))
-                            self.draw_text_with_style(
-                                bbox_img, (0, 0), text_content, custom_font,
-                                fill_color=text_color, opacity=text_opacity,
-                                stroke_width=text_stroke_width, stroke_color=text_stroke_color,
-                                shadow=text_shadow, shadow_offset=text_shadow_offset,
-                                shadow_color=text_shadow_color, shadow_opacity=text_shadow_opacity
-                            )
-                            bbox_img = bbox_img.rotate(rotation_angle, expand=True, resample=Image.BICUBIC)
-                            if img.mode != 'RGBA':
-                                img = img.convert('RGBA')
-                            img.alpha_composite(bbox_img, dest=(draw_x, draw_y))
-                        else:
-                            self.draw_text_with_style(
-                                img, (draw_x, draw_y), text_content, custom_font,
-                                fill_color=text_color, opacity=text_opacity,
-                                stroke_width=text_stroke_width, stroke_color=text_stroke_color,
-                                shadow=text_shadow, shadow_offset=text_shadow_offset,
-                                shadow_color=text_shadow_color, shadow_opacity=text_shadow_opacity
-                            )
-                    else:  # logo
-                        if wm_img is not None:
-                            logo_to_paste = wm_img
-                            if rotation_angle:
-                                logo_to_paste = wm_img.rotate(rotation_angle, expand=True, resample=Image.BICUBIC)
-                            if img.mode != 'RGBA':
-                                img = img.convert('RGBA')
-                            img.alpha_composite(logo_to_paste, dest=(draw_x, draw_y))
-                    if manual_xy:
-                        offset_y += h + spacing
-                    else:
-                        cur_y += h + spacing
-                
-                # 保存图片
-                fmt = (output_format or Path(output_path).suffix.lstrip('.')).lower()
-                if fmt in ('jpg', 'jpeg'):
-                    # JPEG 不支持透明，确保转换为 RGB
-                    if img.mode == 'RGBA':
-                        img = img.convert('RGB')
-                    img.save(output_path, quality=int(jpeg_quality), format='JPEG')
-                elif fmt == 'png':
-                    # PNG 保留透明
-                    img.save(output_path, format='PNG')
-                else:
-                    # 回退到原Pillow推断
-                    img.save(output_path)
+                        pass
+
+                out = self.watermark_image(
+                    img, image_path, font_size=font_size, color=color, position=position,
+                    resize_width=resize_width, resize_height=resize_height, resize_percent=resize_percent,
+                    text_content=text_content, text_font_size=text_font_size, text_color=text_color,
+                    text_opacity=text_opacity, font_path=font_path,
+                    text_stroke_width=text_stroke_width, text_stroke_color=text_stroke_color,
+                    text_shadow=text_shadow, text_shadow_offset=text_shadow_offset,
+                    text_shadow_color=text_shadow_color, text_shadow_opacity=text_shadow_opacity,
+                    logo_path=logo_path, logo_scale_percent=logo_scale_percent,
+                    logo_width=logo_width, logo_height=logo_height, logo_opacity=logo_opacity,
+                    rotation_angle=rotation_angle, use_manual_position=use_manual_position,
+                    manual_pos_rel=manual_pos_rel, inplace=True,
+                )
+                self.save_image(out, output_path, output_format, jpeg_quality, png_compress_level)
                 print(f"✓ 已处理: {os.path.basename(image_path)} -> {os.path.basename(output_path)}")
                 return True
                 
         except Exception as e:
             print(f"✗ 处理图片失败 {os.path.basename(image_path)}: {e}")
             return False
+
+    def watermark_image(self, img, image_path, font_size=24, color='white', position='bottom-right',
+                        resize_width=None, resize_height=None, resize_percent=None,
+                        text_content=None, text_font_size=None, text_color='white', text_opacity=100,
+                        font_path=None, text_stroke_width=0, text_stroke_color='black',
+                        text_shadow=False, text_shadow_offset=2, text_shadow_color='black', text_shadow_opacity=60,
+                        logo_path=None, logo_scale_percent=None, logo_width=None, logo_height=None, logo_opacity=100,
+                        rotation_angle=0, use_manual_position=False, manual_pos_rel=None, inplace=False):
+        """导出核心：对已解码/已打开的 img 缩放并绘制水印，返回结果图像（不保存）
+
+        image_path 用于读取拍摄时间（优先从 img 自带的 EXIF 读取）。出错时直接抛出异常。
+        inplace=False 时不修改 img；调用方不再使用 img 时可设为 True，未缩放时省去一次整图复制。
+        """
+        # 记录是否含透明通道
+        has_alpha = (img.mode in ('RGBA', 'LA')) or ('transparency' in img.info)
+        # 缩放前从原图读取拍摄时间，复用已打开的文件
+        exif_text = self.get_watermark_text(image_path, img)
+
+        # 尺寸调整；未缩放且不允许原地修改时复制一份
+        out = self.apply_resize(img, width=resize_width, height=resize_height, percent=resize_percent)
+        if out is img and not inplace:
+            out = img.copy()
+        out = _normalize_mode(out, has_alpha)
+
+        manual_xy = None
+        if use_manual_position and manual_pos_rel:
+            try:
+                rx, ry = manual_pos_rel
+                manual_xy = (int(rx * out.width), int(ry * out.height))
+            except Exception:
+                manual_xy = None
+        self._draw_watermark(
+            out, exif_text, font_size, color, position,
+            text_content, text_font_size, text_color, text_opacity, font_path,
+            text_stroke_width, text_stroke_color, text_shadow, text_shadow_offset,
+            text_shadow_color, text_shadow_opacity,
+            logo_path, logo_scale_percent, logo_width, logo_height, logo_opacity,
+            rotation_angle, manual_xy,
+        )
+        return out
+
+    def save_image(self, img, output_path, output_format=None, jpeg_quality=95, png_compress_level=PNG_COMPRESS_LEVEL):
+        """按输出格式保存：先编码到内存，再一次性写入文件（避免大量小块 write，失败时也不留半截文件）"""
+        fmt = (output_format or Path(output_path).suffix.lstrip('.')).lower()
+        buf = io.BytesIO()
+        if fmt in ('jpg', 'jpeg'):
+            # JPEG 不支持透明，确保转换为 RGB
+            if img.mode == 'RGBA':
+                img = img.convert('RGB')
+            # 显式关闭 optimize/progressive（省去额外的 Huffman 扫描），固定 4:2:0 采样
+            img.save(buf, format='JPEG', quality=int(jpeg_quality),
+                     optimize=False, progressive=False, subsampling='4:2:0')
+        elif fmt == 'png':
+            # PNG 保留透明
+            img.save(buf, format='PNG', compress_level=int(png_compress_level))
+        else:
+            # 回退到原Pillow推断
+            img.save(output_path)
+            return
+        with open(output_path, 'wb') as f:
+            f.write(buf.getbuffer())
+
+    def _draw_watermark(self, img, exif_text, font_size, color, position,
+                        text_content, text_font_size, text_color, text_opacity, font_path,
+                        text_stroke_width, text_stroke_color, text_shadow, text_shadow_offset,
+                        text_shadow_color, text_shadow_opacity,
+                        logo_path, logo_scale_percent, logo_width, logo_height, logo_opacity,
+                        rotation_angle, manual_xy):
+        """在 img（RGB/RGBA）上原地绘制 EXIF 时间、自定义文本与 Logo；导出与预览共用
+
+        manual_xy: 手动定位时首个块左上角的像素坐标，None 为按 position 锚定
+        """
+        # 规划线性输出：EXIF -> 文本 -> 图片，按位置锚点堆叠
+        base_font = self.get_font(font_size)
+        exif_w, exif_h = _text_size(exif_text, None, font_size)
+
+        custom_font = None
+        custom_w = custom_h = 0
+        has_custom = bool(text_content)
+        if has_custom:
+            csz = int(text_font_size) if text_font_size else font_size
+            custom_font = self.get_font(csz) if not font_path else self.load_font(font_path, csz)
+            custom_w, custom_h = _text_size(text_content, font_path, csz, max(0, int(text_stroke_width)))
+
+        wm_img = None
+        logo_w = logo_h = 0
+        if logo_path:
+            wm_img = self.prepare_logo(logo_path, logo_scale_percent, logo_width, logo_height, logo_opacity)
+            if wm_img is not None:
+                logo_w, logo_h = wm_img.size
+
+        # 计算堆叠位置
+        margin = 20
+        spacing = 8
+        pw, ph = img.width, img.height
+
+        def anchor_x(w):
+            if position.endswith('left') or position == 'left':
+                return margin
+            if position.endswith('right') or position == 'right':
+                return pw - w - margin
+            return (pw - w) // 2
+
+        # 垂直布局依据 position
+        blocks = []
+        # 依次添加：exif, custom text, logo(若有)
+        blocks.append(('exif', exif_w, exif_h))
+        if has_custom:
+            blocks.append(('custom', custom_w, custom_h))
+        if wm_img is not None:
+            blocks.append(('logo', logo_w, logo_h))
+
+        total_h = sum(h for _, _, h in blocks) + spacing * (len(blocks) - 1 if blocks else 0)
+        if position.startswith('top'):
+            cur_y = margin
+        elif position.startswith('bottom'):
+            cur_y = ph - margin - total_h
+        else:  # center 垂直居中
+            cur_y = (ph - total_h) // 2
+
+        # 绘制各块（支持整体旋转和手动定位）
+        try:
+            rotation_angle = int(rotation_angle)
+        except Exception:
+            rotation_angle = 0
+
+        offset_y = 0
+        for kind, w, h in blocks:
+            x = anchor_x(w)
+            draw_x = manual_xy[0] if manual_xy else x
+            draw_y = (manual_xy[1] + offset_y) if manual_xy else cur_y
+            if kind == 'exif':
+                if rotation_angle:
+                    layer = Image.new('RGBA', (w, h), (0, 0, 0, 0))
+                    ImageDraw.Draw(layer).text((0, 0), exif_text, fill=color, font=base_font)
+                    layer = layer.rotate(rotation_angle, expand=True, resample=Image.BICUBIC)
+                    _composite(img, layer, (draw_x, draw_y))
+                else:
+                    ImageDraw.Draw(img).text((draw_x, draw_y), exif_text, fill=color, font=base_font)
+            elif kind == 'custom':
+                if rotation_angle:
+                    bbox_img = Image.new('RGBA', (w, h), (0, 0, 0, 0))
+                    self.draw_text_with_style(
+                        bbox_img, (0, 0), text_content, custom_font,
+                        fill_color=text_color, opacity=text_opacity,
+                        stroke_width=text_stroke_width, stroke_color=text_stroke_color,
+                        shadow=text_shadow, shadow_offset=text_shadow_offset,
+                        shadow_color=text_shadow_color, shadow_opacity=text_shadow_opacity
+                    )
+                    bbox_img = bbox_img.rotate(rotation_angle, expand=True, resample=Image.BICUBIC)
+                    _composite(img, bbox_img, (draw_x, draw_y))
+                else:
+                    self.draw_text_with_style(
+                        img, (draw_x, draw_y), text_content, custom_font,
+                        fill_color=text_color, opacity=text_opacity,
+                        stroke_width=text_stroke_width, stroke_color=text_stroke_color,
+                        shadow=text_shadow, shadow_offset=text_shadow_offset,
+                        shadow_color=text_shadow_color, shadow_opacity=text_shadow_opacity
+                    )
+            else:  # logo
+                if wm_img is not None:
+                    logo_to_paste = self.prepare_logo(logo_path, logo_scale_percent, logo_width, logo_height,
+                                                      logo_opacity, rotation_angle, for_paste=True)
+                    if logo_to_paste is not None:
+                        _composite(img, logo_to_paste, (draw_x, draw_y))
+            if manual_xy:
+                offset_y += h + spacing
+            else:
+                cur_y += h + spacing
     
     def apply_resize(self, img, width=None, height=None, percent=None):
         """统一的尺寸调整入口。
@@ -245,132 +485,87 @@ class PhotoWatermark:
         """
         try:
             if width or height or percent:
-                w, h = img.size
-                if width and height:
-                    tw = max(1, int(width))
-                    th = max(1, int(height))
-                    return img.resize((tw, th), Image.LANCZOS)
-                if width:
-                    tw = max(1, int(width))
-                    th = max(1, int(h * (tw / w)))
-                    return img.resize((tw, th), Image.LANCZOS)
-                if height:
-                    th = max(1, int(height))
-                    tw = max(1, int(w * (th / h)))
-                    return img.resize((tw, th), Image.LANCZOS)
-                if percent:
-                    scale = float(percent) / 100.0
-                    tw = max(1, int(w * scale))
-                    th = max(1, int(h * scale))
-                    return img.resize((tw, th), Image.LANCZOS)
-                return img
+                return img.resize(self.resized_size(img.size, width, height, percent), Image.LANCZOS,
+                                  reducing_gap=RESIZE_REDUCING_GAP)
             return img
         except Exception:
             return img
 
+    def resized_size(self, size, width=None, height=None, percent=None):
+        """按 apply_resize 的规则计算目标尺寸 (w, h)，不做缩放；未指定尺寸时原样返回"""
+        w, h = size
+        if width and height:
+            return max(1, int(width)), max(1, int(height))
+        if width:
+            tw = max(1, int(width))
+            return tw, max(1, int(h * (tw / w)))
+        if height:
+            th = max(1, int(height))
+            return max(1, int(w * (th / h))), th
+        if percent:
+            scale = float(percent) / 100.0
+            return max(1, int(w * scale)), max(1, int(h * scale))
+        return size
+
     def get_font(self, font_size):
         """获取字体对象，跨平台健壮回退"""
-        font_paths = [
-            # Windows 常见
-            "C:/Windows/Fonts/msyh.ttf",  # 微软雅黑
-            "C:/Windows/Fonts/simhei.ttf",  # 黑体
-            "C:/Windows/Fonts/arial.ttf",
-            # macOS 常见
-            "/System/Library/Fonts/PingFang.ttc",
-            "/System/Library/Fonts/STHeiti Light.ttc",
-            "/System/Library/Fonts/Helvetica.ttc",
-            # Linux 常见
-            "/usr/share/fonts/truetype/wqy/wqy-zenhei.ttc",
-            "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
-            # 相对路径/当前目录可能的字体
-            "arial.ttf",
-        ]
-
-        for font_path in font_paths:
-            try:
-                return ImageFont.truetype(font_path, font_size)
-            except Exception:
-                continue
-
-        # 最终回退
-        return ImageFont.load_default()
+        return _load_font(None, font_size)
 
     def load_font(self, font_path, font_size):
-        try:
-            return ImageFont.truetype(font_path, font_size)
-        except Exception:
-            return self.get_font(font_size)
+        return _load_font(font_path, font_size)
 
     def _parse_color_with_opacity(self, color_str, opacity_percent, fallback='white'):
         try:
-            opacity = max(0, min(100, int(opacity_percent)))
-        except Exception:
-            opacity = 100
-        try:
-            rgb = ImageColor.getrgb(color_str)
-        except Exception:
-            rgb = (255, 255, 255) if fallback == 'white' else (0, 0, 0)
-        a = int(round(opacity / 100.0 * 255))
-        return (*rgb, a)
+            return _color_with_opacity(color_str, opacity_percent, fallback)
+        except TypeError:  # 不可哈希的参数不走缓存
+            return _color_with_opacity.__wrapped__(color_str, opacity_percent, fallback)
 
     def draw_text_with_style(self, img, xy, text, font, fill_color='white', opacity=100,
                               stroke_width=0, stroke_color='black', shadow=False,
                               shadow_offset=2, shadow_color='black', shadow_opacity=60):
-        # 确保RGBA以便处理透明度
-        if img.mode != 'RGBA':
-            base_img = img.convert('RGBA')
-        else:
-            base_img = img
-        text_layer = Image.new('RGBA', base_img.size, (0, 0, 0, 0))
+        fill_rgba = self._parse_color_with_opacity(fill_color, opacity, fallback='white')
+        # 不透明、无阴影且原图无透明通道：直接画在原图上，无需透明图层与合成
+        # （RGBA 原图直接画会在字形边缘覆盖原 alpha，需走图层合成）
+        if fill_rgba[3] == 255 and not shadow and img.mode != 'RGBA':
+            ImageDraw.Draw(img).text(xy, text, font=font, fill=fill_rgba[:3], stroke_width=int(stroke_width), stroke_fill=stroke_color)
+            return
+        # 透明图层只覆盖文字（含描边、阴影）所在区域，并裁到图像范围内
+        sw = int(stroke_width)
+        off = int(shadow_offset) if shadow else 0
+        left, top, right, bottom = ImageDraw.Draw(img).textbbox(xy, text, font=font, stroke_width=sw)
+        x0 = max(0, left + min(0, off))
+        y0 = max(0, top + min(0, off))
+        x1 = min(img.width, right + max(0, off))
+        y1 = min(img.height, bottom + max(0, off))
+        if x1 <= x0 or y1 <= y0:
+            return
+        text_layer = Image.new('RGBA', (x1 - x0, y1 - y0), (0, 0, 0, 0))
         d = ImageDraw.Draw(text_layer)
+        lx, ly = xy[0] - x0, xy[1] - y0
 
         # 阴影
         if shadow:
             shadow_rgba = self._parse_color_with_opacity(shadow_color, shadow_opacity, fallback='black')
-            sx = xy[0] + int(shadow_offset)
-            sy = xy[1] + int(shadow_offset)
-            d.text((sx, sy), text, font=font, fill=shadow_rgba, stroke_width=int(stroke_width), stroke_fill=shadow_rgba)
+            d.text((lx + off, ly + off), text, font=font, fill=shadow_rgba, stroke_width=sw, stroke_fill=shadow_rgba)
 
         # 主文本
-        fill_rgba = self._parse_color_with_opacity(fill_color, opacity, fallback='white')
-        d.text(xy, text, font=font, fill=fill_rgba, stroke_width=int(stroke_width), stroke_fill=stroke_color)
+        d.text((lx, ly), text, font=font, fill=fill_rgba, stroke_width=sw, stroke_fill=stroke_color)
 
-        base_img.alpha_composite(text_layer)
-        if img is not base_img:
-            img.paste(base_img)
+        _composite(img, text_layer, (x0, y0))
 
-    def prepare_logo(self, logo_path, scale_percent=None, width=None, height=None, opacity=100):
+    def prepare_logo(self, logo_path, scale_percent=None, width=None, height=None, opacity=100, rotation_angle=0,
+                     for_paste=False):
+        """返回缩放、调整透明度（及旋转）后的 Logo；同一批参数只处理一次，按文件修改时间失效。
+        for_paste=True 且未旋转时，完全不透明的 Logo 以 RGB 返回，供 _composite 直接 paste。
+        """
         try:
-            logo = Image.open(logo_path)
-            if logo.mode != 'RGBA':
-                logo = logo.convert('RGBA')
-            lw, lh = logo.size
-            # 尺寸
-            if width and height:
-                logo = logo.resize((int(width), int(height)), Image.LANCZOS)
-            elif width:
-                tw = int(width)
-                th = max(1, int(lh * (tw / lw)))
-                logo = logo.resize((tw, th), Image.LANCZOS)
-            elif height:
-                th = int(height)
-                tw = max(1, int(lw * (th / lh)))
-                logo = logo.resize((tw, th), Image.LANCZOS)
-            elif scale_percent:
-                scale = float(scale_percent) / 100.0
-                tw = max(1, int(lw * scale))
-                th = max(1, int(lh * scale))
-                logo = logo.resize((tw, th), Image.LANCZOS)
-
-            # 透明度
-            a = max(0, min(100, int(opacity)))
-            alpha = logo.split()[-1]
-            alpha = alpha.point(lambda p: int(p * (a / 100.0)))
-            logo.putalpha(alpha)
-            return logo
-        except Exception:
+            mtime_ns = os.stat(logo_path).st_mtime_ns
+        except (OSError, TypeError, ValueError):
             return None
-    
+        if for_paste and not rotation_angle:
+            return _paste_logo(logo_path, mtime_ns, scale_percent, width, height, opacity)
+        return _prepared_logo(logo_path, mtime_ns, scale_percent, width, height, opacity, rotation_angle)
+
     def process_directory(self, input_dir, font_size=24, color='white', position='bottom-right',
                           output_dir=None, output_format=None, jpeg_quality=95,
                           name_prefix='', name_suffix='', forbid_export_to_input=True,
@@ -379,8 +574,12 @@ class PhotoWatermark:
                           font_path=None, text_stroke_width=0, text_stroke_color='black', text_shadow=False,
                           text_shadow_offset=2, text_shadow_color='black', text_shadow_opacity=60,
                           logo_path=None, logo_scale_percent=None, logo_width=None, logo_height=None, logo_opacity=100,
-                          rotation_angle=0, use_manual_position=False, manual_pos_rel=None):
-        """处理目录中的所有图片"""
+                          rotation_angle=0, use_manual_position=False, manual_pos_rel=None,
+                          workers=None, png_compress_level=PNG_COMPRESS_LEVEL):
+        """处理目录中的所有图片
+
+        workers: 并行处理的进程数（>= 1），None 表示 os.cpu_count()
+        """
         input_path = Path(input_dir)
         if not input_path.exists():
             print(f"❌ 错误: 目录不存在 {input_dir}")
@@ -398,15 +597,16 @@ class PhotoWatermark:
         output_dir.mkdir(exist_ok=True)
         print(f"📁 输出目录: {output_dir}")
         
-        # 查找所有支持的图片文件
-        image_files = []
-        for ext in self.supported_formats:
-            image_files.extend(input_path.glob(f"*{ext}"))
-            image_files.extend(input_path.glob(f"*{ext.upper()}"))
+        # 查找所有支持的图片文件：单次 scandir，按小写扩展名过滤（大小写不敏感的文件系统上也不会重复）
+        with os.scandir(input_path) as it:
+            image_files = sorted(
+                Path(entry.path) for entry in it
+                if entry.is_file() and os.path.splitext(entry.name)[1].lower() in self.supported_formats
+            )
         
         if not image_files:
             print("❌ 未找到支持的图片文件")
-            print(f"支持的格式: {', '.join(self.supported_formats)}")
+            print(f"支持的格式: {', '.join(sorted(self.supported_formats))}")
             return
         
         print(f"📸 找到 {len(image_files)} 个图片文件")
@@ -419,49 +619,22 @@ class PhotoWatermark:
         print("-" * 50)
         
         # 处理每个图片
-        success_count = 0
-        for i, image_file in enumerate(image_files, 1):
-            print(f"[{i}/{len(image_files)}] 处理: {image_file.name}")
-            output_file = output_dir / self.build_output_filename(
-                image_file.name, name_prefix, name_suffix, output_format
-            )
-            try:
-                ok = self.add_watermark(
-                    str(image_file),
-                    str(output_file),
-                    font_size,
-                    color,
-                    position,
-                    output_format=output_format,
-                    jpeg_quality=jpeg_quality,
-                    resize_width=resize_width,
-                    resize_height=resize_height,
-                    resize_percent=resize_percent,
-                    text_content=text_content,
-                    text_font_size=text_font_size,
-                    text_color=text_color,
-                    text_opacity=text_opacity,
-                    font_path=font_path,
-                    text_stroke_width=text_stroke_width,
-                    text_stroke_color=text_stroke_color,
-                    text_shadow=text_shadow,
-                    text_shadow_offset=text_shadow_offset,
-                    text_shadow_color=text_shadow_color,
-                    text_shadow_opacity=text_shadow_opacity,
-                    logo_path=logo_path,
-                    logo_scale_percent=logo_scale_percent,
-                    logo_width=logo_width,
-                    logo_height=logo_height,
-                    logo_opacity=logo_opacity,
-                    rotation_angle=rotation_angle,
-                    use_manual_position=use_manual_position,
-                    manual_pos_rel=manual_pos_rel,
-                )
-                if ok:
-                    success_count += 1
-            except Exception as e:
-                print(f"✗ 处理失败: {e}")
-        
+        success_count = self._run_batch(
+            image_files, output_dir, name_prefix, name_suffix, workers,
+            font_size=font_size, color=color, position=position,
+            output_format=output_format, jpeg_quality=jpeg_quality, png_compress_level=png_compress_level,
+            resize_width=resize_width, resize_height=resize_height, resize_percent=resize_percent,
+            text_content=text_content, text_font_size=text_font_size, text_color=text_color,
+            text_opacity=text_opacity, font_path=font_path,
+            text_stroke_width=text_stroke_width, text_stroke_color=text_stroke_color,
+            text_shadow=text_shadow, text_shadow_offset=text_shadow_offset,
+            text_shadow_color=text_shadow_color, text_shadow_opacity=text_shadow_opacity,
+            logo_path=logo_path, logo_scale_percent=logo_scale_percent,
+            logo_width=logo_width, logo_height=logo_height, logo_opacity=logo_opacity,
+            rotation_angle=rotation_angle, use_manual_position=use_manual_position,
+            manual_pos_rel=manual_pos_rel,
+        )
+
         print("-" * 50)
         print(f"✅ 处理完成！成功处理 {success_count}/{len(image_files)} 个文件")
         print(f"📁 输出目录: {output_dir}")
@@ -474,8 +647,15 @@ class PhotoWatermark:
                       font_path=None, text_stroke_width=0, text_stroke_color='black', text_shadow=False,
                       text_shadow_offset=2, text_shadow_color='black', text_shadow_opacity=60,
                       logo_path=None, logo_scale_percent=None, logo_width=None, logo_height=None, logo_opacity=100,
-                      rotation_angle=0, use_manual_position=False, manual_pos_rel=None):
-        """处理一组指定文件（用于GUI批量导入）"""
+                      rotation_angle=0, use_manual_position=False, manual_pos_rel=None,
+                      exif_cache=None, workers=None, png_compress_level=PNG_COMPRESS_LEVEL):
+        """处理一组指定文件（用于GUI批量导入）
+
+        exif_cache: 可选，(image_path, st_mtime_ns) -> datetime/None 的预读拍摄时间，命中时不再读取 EXIF
+        workers: 并行处理的进程数（>= 1），None 表示 os.cpu_count()
+        """
+        if exif_cache:
+            self.exif_cache.update(exif_cache)
         files = [Path(p) for p in files]
         if not files:
             print("❌ 未提供文件")
@@ -483,60 +663,89 @@ class PhotoWatermark:
         # 校验输出目录
         output_dir = Path(output_dir)
         # 如果所有文件都来自同一个目录，且禁止导出到相同目录，则拒绝
-        if forbid_export_to_input:
-            parent_dirs = {f.parent.resolve() for f in files}
-            if len(parent_dirs) == 1 and output_dir.resolve() in parent_dirs:
-                print("❌ 为防止覆盖原图，禁止导出到原文件夹")
-                return
+        if forbid_export_to_input and self.is_export_to_input(files, output_dir):
+            print("❌ 为防止覆盖原图，禁止导出到原文件夹")
+            return
         output_dir.mkdir(parents=True, exist_ok=True)
         print(f"📁 输出目录: {output_dir}")
         print(f"📦 文件数: {len(files)}")
-        success_count = 0
-        for i, f in enumerate(files, 1):
-            print(f"[{i}/{len(files)}] 处理: {f.name}")
-            output_file = output_dir / self.build_output_filename(
-                f.name, name_prefix, name_suffix, output_format
-            )
-            try:
-                ok = self.add_watermark(
-                    str(f), str(output_file), font_size, color, position,
-                    output_format=output_format, jpeg_quality=jpeg_quality,
-                    resize_width=resize_width, resize_height=resize_height, resize_percent=resize_percent,
-                    text_content=text_content,
-                    text_font_size=text_font_size,
-                    text_color=text_color,
-                    text_opacity=text_opacity,
-                    font_path=font_path,
-                    text_stroke_width=text_stroke_width,
-                    text_stroke_color=text_stroke_color,
-                    text_shadow=text_shadow,
-                    text_shadow_offset=text_shadow_offset,
-                    text_shadow_color=text_shadow_color,
-                    text_shadow_opacity=text_shadow_opacity,
-                    logo_path=logo_path,
-                    logo_scale_percent=logo_scale_percent,
-                    logo_width=logo_width,
-                    logo_height=logo_height,
-                    logo_opacity=logo_opacity,
-                    rotation_angle=rotation_angle,
-                    use_manual_position=use_manual_position,
-                    manual_pos_rel=manual_pos_rel,
-                )
-                if ok:
-                    success_count += 1
-            except Exception as e:
-                print(f"✗ 处理失败 {f.name}: {e}")
+        success_count = self._run_batch(
+            files, output_dir, name_prefix, name_suffix, workers,
+            font_size=font_size, color=color, position=position,
+            output_format=output_format, jpeg_quality=jpeg_quality, png_compress_level=png_compress_level,
+            resize_width=resize_width, resize_height=resize_height, resize_percent=resize_percent,
+            text_content=text_content, text_font_size=text_font_size, text_color=text_color,
+            text_opacity=text_opacity, font_path=font_path,
+            text_stroke_width=text_stroke_width, text_stroke_color=text_stroke_color,
+            text_shadow=text_shadow, text_shadow_offset=text_shadow_offset,
+            text_shadow_color=text_shadow_color, text_shadow_opacity=text_shadow_opacity,
+            logo_path=logo_path, logo_scale_percent=logo_scale_percent,
+            logo_width=logo_width, logo_height=logo_height, logo_opacity=logo_opacity,
+            rotation_angle=rotation_angle, use_manual_position=use_manual_position,
+            manual_pos_rel=manual_pos_rel,
+        )
         print("-" * 50)
         print(f"✅ 处理完成！成功处理 {success_count}/{len(files)} 个文件")
 
+    def _run_batch(self, files, output_dir, name_prefix, name_suffix, workers, **kwargs):
+        """用进程池并行处理一批文件，返回成功数量
+
+        每个文件相互独立；文字绘制与合成持有 GIL，进程池才能用满多核。
+        已预读的拍摄时间随任务传给子进程。进度按输入顺序在调用进程中打印。
+        """
+        # 只有 None 表示使用全部 CPU 核数；0 或负数视为调用错误，不悄悄改成全部核数
+        workers = (os.cpu_count() or 1) if workers is None else int(workers)
+        if workers < 1:
+            raise ValueError(f"workers 必须 >= 1，当前为 {workers}")
+        jobs = self.build_batch_jobs(files, output_dir, name_prefix, name_suffix, **kwargs)
+        if workers == 1 or len(jobs) == 1:
+            # 单个文件/单进程时直接在当前进程处理，省去进程启动开销
+            results = (_run_job(job, self) for job in jobs)
+            return self._report_batch(files, results)
+        with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as ex:
+            return self._report_batch(files, ex.map(_run_job, jobs, chunksize=BATCH_CHUNKSIZE))
+
+    def build_batch_jobs(self, files, output_dir, name_prefix='', name_suffix='', **kwargs):
+        """为每个文件生成 _run_job 任务 (源路径, 输出路径, 预读拍摄时间, add_watermark 参数)
+
+        CLI 与 GUI 导出共用：输出命名与 exif_cache 中已预读的拍摄时间都在这里确定。
+        """
+        output_dir = Path(output_dir)
+        jobs = []
+        for f in files:
+            src = str(f)
+            output_file = output_dir / self.build_output_filename(
+                os.path.basename(src), name_prefix, name_suffix, kwargs.get('output_format')
+            )
+            key = _exif_cache_key(src)
+            exif = (key[1], self.exif_cache[key]) if key in self.exif_cache else None
+            jobs.append((src, str(output_file), exif, kwargs))
+        return jobs
+
+    def _report_batch(self, files, results):
+        success_count = 0
+        for i, (f, (ok, err)) in enumerate(zip(files, results), 1):
+            if err is not None:
+                print(f"[{i}/{len(files)}] ✗ 处理失败 {f.name}: {err}")
+            else:
+                print(f"[{i}/{len(files)}] 处理: {f.name}")
+            if ok:
+                success_count += 1
+        return success_count
+
+    def is_export_to_input(self, files, output_dir):
+        """所有文件都来自同一个目录且输出目录正是该目录时返回 True"""
+        # 先按目录字符串去重，再逐个解析真实路径：resolve 次数取决于目录数而非文件数
+        parent_dirs = {Path(d).resolve() for d in {os.path.dirname(os.path.abspath(f)) for f in files}}
+        return len(parent_dirs) == 1 and Path(output_dir).resolve() in parent_dirs
+
     def build_output_filename(self, original_name, prefix, suffix, output_format):
         stem = Path(original_name).stem
-        ext = (output_format.lower() if output_format else Path(original_name).suffix.lstrip('.')).lower()
-        if ext == 'jpg':
-            ext = 'jpeg'
+        ext = (output_format or Path(original_name).suffix.lstrip('.')).lower()
+        ext = _EXT_ALIASES.get(ext, ext)
         return f"{prefix}{stem}{suffix}.{ext}"
 
-    # 预览用：对已有 PIL.Image 应用水印（不保存）
+    # 预览用：对已有 PIL.Image 应用水印（不缩放、不保存；出错时返回原图）
     def add_watermark_to_image(self, image, image_path, font_size=24, color='white', position='bottom-right',
                                text_content=None, text_font_size=None, text_color='white', text_opacity=100,
                                font_path=None, text_stroke_width=0, text_stroke_color='black',
@@ -544,125 +753,44 @@ class PhotoWatermark:
                                logo_path=None, logo_scale_percent=None, logo_width=None, logo_height=None, logo_opacity=100,
                                rotation_angle=0, use_manual_position=False, manual_xy=None):
         try:
-            img = image.copy()
-            has_alpha = (img.mode in ('RGBA', 'LA')) or ('transparency' in img.info)
-            if has_alpha:
-                if img.mode != 'RGBA':
-                    img = img.convert('RGBA')
-            else:
-                if img.mode not in ('RGB', 'RGBA'):
-                    img = img.convert('RGB')
-            draw = ImageDraw.Draw(img)
-
+            has_alpha = (image.mode in ('RGBA', 'LA')) or ('transparency' in image.info)
+            img = _normalize_mode(image.copy(), has_alpha)
             exif_text = self.get_watermark_text(image_path)
-            base_font = self.get_font(font_size)
-            exif_bbox = draw.textbbox((0, 0), exif_text, font=base_font)
-            exif_w = exif_bbox[2] - exif_bbox[0]
-            exif_h = exif_bbox[3] - exif_bbox[1]
-
-            custom_font = None
-            custom_w = custom_h = 0
-            has_custom = bool(text_content)
-            if has_custom:
-                csz = int(text_font_size) if text_font_size else font_size
-                custom_font = self.get_font(csz) if not font_path else self.load_font(font_path, csz)
-                custom_bbox = draw.textbbox((0, 0), text_content, font=custom_font, stroke_width=max(0, int(text_stroke_width)))
-                custom_w = custom_bbox[2] - custom_bbox[0]
-                custom_h = custom_bbox[3] - custom_bbox[1]
-
-            wm_img = None
-            logo_w = logo_h = 0
-            if logo_path:
-                wm_img = self.prepare_logo(logo_path, logo_scale_percent, logo_width, logo_height, logo_opacity)
-                if wm_img is not None:
-                    logo_w, logo_h = wm_img.size
-
-            margin = 20
-            spacing = 8
-            pw, ph = img.width, img.height
-
-            def anchor_x(w):
-                if position.endswith('left') or position == 'left':
-                    return margin
-                if position.endswith('right') or position == 'right':
-                    return pw - w - margin
-                return (pw - w) // 2
-
-            blocks = []
-            blocks.append(('exif', exif_w, exif_h))
-            if has_custom:
-                blocks.append(('custom', custom_w, custom_h))
-            if wm_img is not None:
-                blocks.append(('logo', logo_w, logo_h))
-
-            total_h = sum(h for _, _, h in blocks) + spacing * (len(blocks) - 1 if blocks else 0)
-            if position.startswith('top'):
-                cur_y = margin
-            elif position.startswith('bottom'):
-                cur_y = ph - margin - total_h
-            else:
-                cur_y = (ph - total_h) // 2
-
-            try:
-                rotation_angle = int(rotation_angle)
-            except Exception:
-                rotation_angle = 0
-
-            offset_y = 0
-            for kind, w, h in blocks:
-                x = anchor_x(w)
-                draw_x = manual_xy[0] if (manual_xy and use_manual_position) else x
-                draw_y = (manual_xy[1] + offset_y) if (manual_xy and use_manual_position) else cur_y
-                if kind == 'exif':
-                    if rotation_angle:
-                        layer = Image.new('RGBA', (w, h), (0, 0, 0, 0))
-                        ImageDraw.Draw(layer).text((0, 0), exif_text, fill=color, font=base_font)
-                        layer = layer.rotate(rotation_angle, expand=True, resample=Image.BICUBIC)
-                        if img.mode != 'RGBA':
-                            img = img.convert('RGBA')
-                        img.alpha_composite(layer, dest=(draw_x, draw_y))
-                    else:
-                        draw.text((draw_x, draw_y), exif_text, fill=color, font=base_font)
-                elif kind == 'custom':
-                    if rotation_angle:
-                        bbox_img = Image.new('RGBA', (w, h), (0, 0, 0, 0))
-                        self.draw_text_with_style(
-                            bbox_img, (0, 0), text_content, custom_font,
-                            fill_color=text_color, opacity=text_opacity,
-                            stroke_width=text_stroke_width, stroke_color=text_stroke_color,
-                            shadow=text_shadow, shadow_offset=text_shadow_offset,
-                            shadow_color=text_shadow_color, shadow_opacity=text_shadow_opacity
-                        )
-                        bbox_img = bbox_img.rotate(rotation_angle, expand=True, resample=Image.BICUBIC)
-                        if img.mode != 'RGBA':
-                            img = img.convert('RGBA')
-                        img.alpha_composite(bbox_img, dest=(draw_x, draw_y))
-                    else:
-                        self.draw_text_with_style(
-                            img, (draw_x, draw_y), text_content, custom_font,
-                            fill_color=text_color, opacity=text_opacity,
-                            stroke_width=text_stroke_width, stroke_color=text_stroke_color,
-                            shadow=text_shadow, shadow_offset=text_shadow_offset,
-                            shadow_color=text_shadow_color, shadow_opacity=text_shadow_opacity
-                        )
-                else:
-                    if wm_img is not None:
-                        logo_to_paste = wm_img
-                        if rotation_angle:
-                            logo_to_paste = wm_img.rotate(rotation_angle, expand=True, resample=Image.BICUBIC)
-                        if img.mode != 'RGBA':
-                            img = img.convert('RGBA')
-                        img.alpha_composite(logo_to_paste, dest=(draw_x, draw_y))
-                if (manual_xy and use_manual_position):
-                    offset_y += h + spacing
-                else:
-                    cur_y += h + spacing
-
+            self._draw_watermark(
+                img, exif_text, font_size, color, position,
+                text_content, text_font_size, text_color, text_opacity, font_path,
+                text_stroke_width, text_stroke_color, text_shadow, text_shadow_offset,
+                text_shadow_color, text_shadow_opacity,
+                logo_path, logo_scale_percent, logo_width, logo_height, logo_opacity,
+                rotation_angle, manual_xy if use_manual_position else None,
+            )
             return img
         except Exception:
             return image
 
 
+_worker_watermark = None  # 进程池子进程内复用的实例（字体、Logo 等缓存随之复用）
+
+
+def _run_job(job, watermark=None):
+    """批量任务：处理单个文件，返回 (是否成功, 错误信息或 None)
+
+    job: (源路径, 输出路径, 预读拍摄时间 (st_mtime_ns, dt) 或 None, add_watermark 参数)
+    """
+    global _worker_watermark
+    if watermark is None:
+        if _worker_watermark is None:
+            _worker_watermark = PhotoWatermark()
+        watermark = _worker_watermark
+    src, dst, exif, kwargs = job
+    if exif is not None:
+        watermark.exif_cache[(src, exif[0])] = exif[1]
+    try:
+        return watermark.add_watermark(src, dst, **kwargs), None
+    except Exception as e:
+        return False, str(e)
+
+
 def main():
     parser = argparse.ArgumentParser(description='为图片添加水印（默认添加EXIF时间；可选添加自定义文本与图片Logo）')
     parser.add_argument('input_dir', nargs='?', default='.', help='输入图片目录路径 (默认: 当前目录)')
@@ -675,6 +803,8 @@ def main():
     parser.add_argument('--output-dir', default=None, help='输出目录 (默认: 原目录下 *_watermark)')
     parser.add_argument('--output-format', choices=['jpeg', 'png'], default=None, help='输出格式 (可选: jpeg 或 png)')
     parser.add_argument('--jpeg-quality', type=int, default=95, help='JPEG质量 0-100 (默认:95)')
+    parser.add_argument('--png-compress-level', type=int, choices=range(10), default=PNG_COMPRESS_LEVEL, metavar='0-9',
+                        help=f'PNG压缩级别 0-9，越小越快、文件越大 (默认:{PNG_COMPRESS_LEVEL})')
     # 水印样式（默认总是添加EXIF文本；可另外添加自定义文本与Logo）
     parser.add_argument('--text-content', default=None, help='自定义文本内容')
     parser.add_argument('--text-color', default='white', help='文本颜色')
@@ -698,8 +828,11 @@ def main():
     parser.add_argument('--resize-width', type=int, default=None, help='输出宽度（像素）')
     parser.add_argument('--resize-height', type=int, default=None, help='输出高度（像素）')
     parser.add_argument('--resize-percent', type=float, default=None, help='输出百分比（0-100）')
+    parser.add_argument('--workers', type=int, default=None, help='并行处理进程数，须 >= 1 (默认: 全部 CPU 核数)')
     
     args = parser.parse_args()
+    if args.workers is not None and args.workers < 1:
+        parser.error(f"--workers 须 >= 1（省略则使用全部 CPU 核数），当前为 {args.workers}")
     
     # 创建水印工具实例
     watermark_tool = PhotoWatermark()
@@ -713,6 +846,7 @@ def main():
         output_dir=args.output_dir,
         output_format=args.output_format,
         jpeg_quality=args.jpeg_quality,
+        png_compress_level=args.png_compress_level,
         name_prefix=args.name_prefix,
         name_suffix=args.name_suffix,
         forbid_export_to_input=(not args.allow_export_to_input),
@@ -734,6 +868,7 @@ def main():
         logo_width=args.logo_width,
         logo_height=args.logo_height,
         logo_opacity=args.logo_opacity,
+        workers=args.workers,
     )
 
 
@@ -2,57 +2,160 @@
 # -*- coding: utf-8 -*-
 """
 测试水印工具
+
+可选：安装 Pillow-SIMD（安装方法见 README）可加快测试图片生成与水印处理，无需修改代码。
 """
 
 import os
 import sys
-from PIL import Image
+import tempfile
+import PIL
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from PIL import Image, ImageChops, ImageDraw
 from photo_watermark import PhotoWatermark
 
 
-def create_test_image(filename, width=800, height=600):
-    """创建一个测试图片"""
-    img = Image.new('RGB', (width, height), color='lightblue')
+# 生成的测试图片尺寸：足够容纳标签与各位置的水印，像素量仅为 800×600 的 1/6
+TEST_IMAGE_SIZE = (320, 240)
+
+
+@lru_cache(maxsize=None)
+def _watermark_tool():
+    """每个工作进程只创建一个水印工具实例"""
+    return PhotoWatermark()
+
+
+def _apply_one(job):
+    """进程池任务：一张输入图片只解码一次，经导出核心 watermark_image/save_image 依次生成各位置的水印图"""
+    input_path, outputs = job
+    tool = _watermark_tool()
+    with Image.open(input_path) as img:
+        img.load()
+        for position, output_path in outputs:
+            out = tool.watermark_image(img, input_path, font_size=20, color='red', position=position)
+            tool.save_image(out, output_path)
+            print(f"✓ 已处理: {os.path.basename(input_path)} -> {os.path.basename(output_path)}")
+    return len(outputs)
+
+
+def _fixture_is_current(path):
+    """上次运行留下的测试图片可直接复用：比本脚本新且尺寸与 TEST_IMAGE_SIZE 一致"""
+    try:
+        if os.path.getmtime(path) < os.path.getmtime(__file__):
+            return False
+        with Image.open(path) as img:
+            return img.size == TEST_IMAGE_SIZE
+    except Exception:
+        return False
+
+
+def create_test_image(filename, width=TEST_IMAGE_SIZE[0], height=TEST_IMAGE_SIZE[1], base=None):
+    """创建一个测试图片；传入 base 时复制该底图，省去重复填充"""
+    img = base.copy() if base is not None else Image.new('RGB', (width, height), color='lightblue')
     draw = ImageDraw.Draw(img)
     draw.text((50, 50), f"Test Image: {filename}", fill='black')
-    img.save(filename)
+    # 纯色底图：按格式选用最快的编码参数
+    if filename.lower().endswith('.png'):
+        img.save(filename, 'PNG', compress_level=1)
+    else:
+        img.save(filename, quality=85, optimize=False, progressive=False)
     print(f"创建测试图片: {filename}")
 
 
 def test_watermark():
     """测试水印功能"""
     print("开始测试水印工具...")
+    # 版本号带 .postN 后缀即为 Pillow-SIMD
+    print(f"Pillow 版本: {PIL.__version__}")
     
     # 创建测试目录
     test_dir = "test_images"
-    if not os.path.exists(test_dir):
-        os.makedirs(test_dir)
+    os.makedirs(test_dir, exist_ok=True)
     
-    # 创建测试图片
+    # 创建测试图片（上次运行生成且仍然有效的直接复用，过期或尺寸不符则重新生成）
     test_files = ["test1.jpg", "test2.png", "test3.jpg"]
+    base = None
     for filename in test_files:
-        create_test_image(os.path.join(test_dir, filename))
-    
-    # 测试水印工具
-    watermark_tool = PhotoWatermark()
+        path = os.path.join(test_dir, filename)
+        if _fixture_is_current(path):
+            continue
+        if base is None:
+            base = Image.new('RGB', TEST_IMAGE_SIZE, color='lightblue')
+        create_test_image(path, base=base)
     
     print("\n测试不同位置的水印:")
     positions = ['top-left', 'top-right', 'bottom-left', 'bottom-right', 'center']
     
-    for i, position in enumerate(positions):
-        output_dir = f"test_output_{position}"
-        if not os.path.exists(output_dir):
-            os.makedirs(output_dir)
-        
-        for filename in test_files:
-            input_path = os.path.join(test_dir, filename)
-            output_path = os.path.join(output_dir, f"{position}_{filename}")
-            watermark_tool.add_watermark(input_path, output_path, 
-                                       font_size=20, color='red', position=position)
+    # 所有输出放在同一目录，文件名前缀区分位置
+    output_dir = "test_output"
+    os.makedirs(output_dir, exist_ok=True)
+    
+    # 每个文件一个任务（解码一次，输出各位置），文件间交给进程池并行处理；输出命名与导出一致
+    tool = _watermark_tool()
+    jobs = []
+    for filename in test_files:
+        input_path = os.path.join(test_dir, filename)
+        outputs = [(position, os.path.join(output_dir, tool.build_output_filename(filename, f"{position}_", '', None)))
+                   for position in positions]
+        jobs.append((input_path, outputs))
+    
+    with ProcessPoolExecutor(max_workers=os.cpu_count()) as ex:
+        list(ex.map(_apply_one, jobs))
+    
+    # 每个输出都应存在、尺寸与输入一致，且确实画上了水印（红字与浅蓝底差异远大于 JPEG 重新编码的误差）
+    for input_path, outputs in jobs:
+        with Image.open(input_path) as src:
+            src = src.convert('RGB')
+        for position, output_path in outputs:
+            assert os.path.exists(output_path), output_path
+            with Image.open(output_path) as out:
+                assert out.size == src.size, (output_path, out.size)
+                diff = ImageChops.difference(out.convert('RGB'), src)
+            assert max(hi for _, hi in diff.getextrema()) > 64, f"{output_path} 未绘制水印"
     
     print("\n测试完成！请检查输出目录中的图片。")
 
 
+def test_opaque_text_on_rgba_matches_composite():
+    """半透明 RGBA 原图上画不透明文字，应与透明图层整幅合成的结果一致（字形边缘保留原 alpha）"""
+    tool = _watermark_tool()
+    font = tool.get_font(24)
+    src = Image.new('RGBA', TEST_IMAGE_SIZE, (40, 120, 200, 128))
+    out = src.copy()
+    tool.draw_text_with_style(out, (20, 30), '2024-01-01', font, fill_color='white', stroke_width=1)
+
+    layer = Image.new('RGBA', src.size, (0, 0, 0, 0))
+    ImageDraw.Draw(layer).text((20, 30), '2024-01-01', font=font, fill=(255, 255, 255, 255),
+                               stroke_width=1, stroke_fill='black')
+    expected = Image.alpha_composite(src, layer)
+    assert out.tobytes() == expected.tobytes()
+
+
+def test_iter_dropped_uses_scandir_for_unnormalized_paths():
+    """拖入路径分隔符未规范化（如 Windows 下 C:/x/a.jpg）时，仍命中父目录 scandir 的目录项，不逐个 stat"""
+    import gui
+    with tempfile.TemporaryDirectory() as parent:
+        names = [f'img{i:03d}.jpg' for i in range(gui.DROP_SCANDIR_MIN)]
+        for name in names:
+            open(os.path.join(parent, name), 'wb').close()
+        os.mkdir(os.path.join(parent, 'sub'))
+        Image.new('RGB', (8, 8)).save(os.path.join(parent, 'sub', 'a.jpg'))
+        # 重复的分隔符与 os.path.join 拼出的路径字符串不同，但指向同一目录项
+        raw = [parent + '//' + name for name in names + ['sub']]
+
+        tool = object.__new__(gui.WatermarkGUI)
+        isdir = os.path.isdir
+        calls = []
+        os.path.isdir = lambda p: calls.append(p) or isdir(p)
+        try:
+            result = list(tool._iter_dropped(raw))
+        finally:
+            os.path.isdir = isdir
+
+    assert calls == [], calls
+    assert result == raw[:-1] + [os.path.join(parent + '//sub', 'a.jpg')], result[-3:]
+
+
 if __name__ == "__main__":
-    from PIL import ImageDraw
     test_watermark()